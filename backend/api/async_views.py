@@ -0,0 +1,211 @@
+"""Асинхронный путь чтения для ASGI.
+
+GET-запросы списков и карточек рецептов, тегов и ингредиентов и
+переходы по коротким ссылкам обрабатываются здесь через асинхронный
+ORM, поэтому под ASGI один процесс держит много одновременных
+запросов, ожидающих базу. Всё остальное (запись, анонимные ответы из
+кэша, курсорная пагинация, поиск, browsable API, ошибки) передаётся
+синхронным view DRF без изменений.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseRedirect
+from django.utils.cache import patch_vary_headers
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.request import Request
+
+from api.authentication import aget_user_by_token
+from api.catalog import (aget_catalog_version, catalog_response,
+                         catalog_responses, ingredient_index)
+from api.replicas import aget_read_replica
+from api.short_url import SHORT_URL_KEY, short_urls
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from foodgram.db_router import read_from
+from foodgram.renderers import FastJSONRenderer
+from recipes.models import Recipe
+
+SYNC_ONLY_LIST_PARAMS = ('cursor', 'count', 'search')
+
+
+def async_read_view(handler):
+    """Делает из асинхронного обработчика view с запасным синхронным.
+
+    Обработчик возвращает None, если запрос ему не подходит, тогда
+    ответ строит sync_view. Он же отвечает, если реплика, из которой
+    читал обработчик, стала недоступна.
+    """
+    def factory(sync_view):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if (request.method == 'GET' and 'format' not in request.GET
+                    and 'text/html' not in request.headers.get('Accept', '')):
+                try:
+                    response = await handler(request, *args, **kwargs)
+                except DatabaseError:
+                    response = None
+                if response is not None:
+                    return response
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        # csrf_exempt в Django 4.2 не поддерживает async view.
+        view.csrf_exempt = True
+        return view
+    return factory
+
+
+async def aget_user(request):
+    """Пользователь по токену или None, если токен неверный."""
+    header = request.headers.get('Authorization', '').split()
+    if not header or header[0].lower() != 'token':
+        return AnonymousUser()
+    if len(header) != 2:
+        return None
+    user = await aget_user_by_token(header[1])
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
+def get_viewset(viewset_class, basename, action, request, user, **kwargs):
+    request = Request(request)
+    request.user = user
+    return viewset_class(basename=basename, action=action,
+                         detail='pk' in kwargs, format_kwarg=None,
+                         request=request, args=(), kwargs=kwargs)
+
+
+def json_response(data):
+    response = HttpResponse(FastJSONRenderer().render(data),
+                            content_type='application/json')
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+async def afetch(queryset):
+    """Загружает queryset вместе с prefetch_related, чтобы
+    сериализация не обращалась к базе."""
+    return [obj async for obj in queryset]
+
+
+async def aprepare(view, recipes):
+    """Связи пользователя и фрагменты карточек загружаются в потоке,
+    дальше сериализатор берёт их из памяти."""
+    await sync_to_async(view.get_serializer().prepare)(recipes)
+
+
+@async_read_view
+async def recipe_list(request):
+    if any(param in request.GET for param in SYNC_ONLY_LIST_PARAMS):
+        return None
+    user = await aget_user(request)
+    if user is None or not user.is_authenticated:
+        return None
+    with read_from(await aget_read_replica(user)):
+        return await recipe_list_page(request, user)
+
+
+async def recipe_list_page(request, user):
+    view = get_viewset(RecipeViewSet, 'recipes', 'list', request, user)
+    filterset = DjangoFilterBackend().get_filterset(
+        view.request, view.get_queryset(), view)
+    if not await sync_to_async(filterset.is_valid)():
+        return None
+    pagination = view.paginator
+    paginator = Paginator(filterset.qs, pagination.get_page_size(
+        view.request))
+    paginator.count = await filterset.qs.acount()
+    try:
+        page = paginator.page(
+            request.GET.get(pagination.page_query_param, 1))
+    except InvalidPage:
+        return None
+    page.object_list = await afetch(page.object_list)
+    await aprepare(view, page.object_list)
+    pagination.page = page
+    pagination.request = view.request
+    pagination.keyset = None
+    return json_response(pagination.get_paginated_response(
+        view.get_serializer(page.object_list, many=True).data).data)
+
+
+@async_read_view
+async def recipe_detail(request, pk):
+    user = await aget_user(request)
+    if user is None or not user.is_authenticated:
+        return None
+    view = get_viewset(RecipeViewSet, 'recipes', 'retrieve', request, user,
+                       pk=pk)
+    with read_from(await aget_read_replica(user)):
+        recipes = await afetch(view.get_queryset().filter(pk=pk))
+        await aprepare(view, recipes)
+    if not recipes:
+        return None
+    return json_response(view.get_serializer(recipes[0]).data)
+
+
+async def catalog_list(request, basename):
+    entry = catalog_responses.get_cached(
+        basename, await aget_catalog_version())
+    if entry is None:
+        return None
+    return catalog_response(request, entry)
+
+
+async def catalog_detail(request, viewset_class, basename, pk):
+    view = get_viewset(viewset_class, basename, 'retrieve', request,
+                       AnonymousUser(), pk=pk)
+    with read_from(await aget_read_replica(AnonymousUser())):
+        obj = await view.get_queryset().filter(pk=pk).afirst()
+    if obj is None:
+        return None
+    return json_response(view.get_serializer(obj).data)
+
+
+@async_read_view
+async def tag_list(request):
+    return await catalog_list(request, 'tags')
+
+
+@async_read_view
+async def tag_detail(request, pk):
+    return await catalog_detail(request, TagViewSet, 'tags', pk)
+
+
+@async_read_view
+async def ingredient_list(request):
+    name = request.GET.get('name')
+    if not name:
+        return await catalog_list(request, 'ingredients')
+    version = await aget_catalog_version()
+    if version is None or ingredient_index.version != version:
+        return None
+    return json_response(ingredient_index.lookup(name))
+
+
+@async_read_view
+async def ingredient_detail(request, pk):
+    return await catalog_detail(request, IngredientViewSet, 'ingredients',
+                                pk)
+
+
+@async_read_view
+async def short_url_redirect(request, short_url):
+    recipe_id = short_urls.get(short_url)
+    if recipe_id is None:
+        key = SHORT_URL_KEY.format(short_url=short_url)
+        recipe_id = await cache.aget(key)
+        if recipe_id is None:
+            with read_from(await aget_read_replica(AnonymousUser())):
+                recipe_id = await Recipe.objects.filter(
+                    short_url=short_url).values_list(
+                        'id', flat=True).afirst()
+            if recipe_id is None:
+                return None
+            await cache.aset(key, recipe_id, None)
+        short_urls.set(short_url, recipe_id)
+    return HttpResponseRedirect(request.build_absolute_uri(
+        f'/recipes/{recipe_id}/'))
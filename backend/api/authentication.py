@@ -0,0 +1,123 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.lru import TimedLRU
+from foodgram import constants
+from users.models import User
+
+AUTH_TOKEN_KEY = 'auth_token:{key}'
+AUTH_USER_VERSION_KEY = 'auth_user_version:{user_id}'
+
+# Счётчики и пароль не кэшируются: первые меняются постоянно и при
+# сохранении пользователя затёрли бы свежие значения, второй не нужен
+# на каждый запрос. Такие поля остаются отложенными. Порядок - как
+# в модели, его ожидает Model.from_db().
+CACHED_USER_FIELDS = (
+    'id', 'is_superuser', 'is_staff', 'is_active', 'email', 'username',
+    'first_name', 'last_name', 'avatar', 'avatar_variants',
+)
+
+tokens = TimedLRU(constants.AUTH_TOKEN_LRU_SIZE,
+                  constants.AUTH_TOKEN_LRU_TIMEOUT)
+
+
+def get_user_version(user_id):
+    return cache.get_or_set(
+        AUTH_USER_VERSION_KEY.format(user_id=user_id), time.time_ns, None)
+
+
+def forget_cached_user(user_id):
+    """Сбрасывает закэшированные токены пользователя во всех процессах,
+    если кэш общий (settings.SHARED_CACHE)."""
+    cache.set(AUTH_USER_VERSION_KEY.format(user_id=user_id),
+              time.time_ns(), None)
+
+
+def load_token_data(key):
+    # Версия читается до полей пользователя: если он изменится между
+    # этими запросами, запись сразу окажется устаревшей.
+    user_id = Token.objects.filter(key=key).values_list(
+        'user_id', flat=True).first()
+    if user_id is None:
+        return None
+    version = get_user_version(user_id)
+    values = User.objects.filter(pk=user_id).values_list(
+        *CACHED_USER_FIELDS).first()
+    if values is None:
+        return None
+    return {'version': version, 'values': values}
+
+
+def is_current(data):
+    return data['version'] == get_user_version(data['values'][0])
+
+
+def get_token_data(key):
+    if not settings.SHARED_CACHE:
+        # Сброс версии в кэше процесса не увидят другие воркеры, поэтому
+        # без общего кэша токен проверяется по базе на каждый запрос.
+        return load_token_data(key)
+    data = tokens.get(key)
+    if data is not None and is_current(data):
+        return data
+    data = cache.get(AUTH_TOKEN_KEY.format(key=key))
+    if data is None or not is_current(data):
+        data = load_token_data(key)
+        if data is None:
+            return None
+        cache.set(AUTH_TOKEN_KEY.format(key=key), data,
+                  constants.AUTH_TOKEN_CACHE_TIMEOUT)
+    tokens.set(key, data)
+    return data
+
+
+def build_user(data):
+    """Пользователь из закэшированных полей: отдельный экземпляр на
+    запрос, без обращений к базе при обычной работе с ним."""
+    return User.from_db('default', CACHED_USER_FIELDS, data['values'])
+
+
+def get_user_by_token(key):
+    data = get_token_data(key)
+    if data is None:
+        return None
+    return build_user(data)
+
+
+async def aget_user_by_token(key):
+    if not settings.SHARED_CACHE:
+        return await sync_to_async(get_user_by_token)(key)
+    data = tokens.get(key)
+    if data is None or data['version'] != await cache.aget(
+            AUTH_USER_VERSION_KEY.format(user_id=data['values'][0])):
+        data = await sync_to_async(get_token_data)(key)
+        if data is None:
+            return None
+    return build_user(data)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса Token + User на каждый запрос.
+
+    Данные токена живут в TimedLRU процесса и в общем кэше. Версия
+    пользователя в общем кэше проверяется при каждом запросе, поэтому
+    выход, удаление токена, смена пароля и деактивация действуют сразу.
+    С кэшем одного процесса (LocMemCache) токен, как и в
+    TokenAuthentication, читается из базы на каждый запрос.
+    """
+
+    def authenticate_credentials(self, key):
+        user = get_user_by_token(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return user, key
@@ -0,0 +1,186 @@
+import gzip
+import hashlib
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from foodgram import constants
+from foodgram.db_router import read_from
+from foodgram.renderers import FastJSONRenderer
+from recipes.models import Ingredient, Tag
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+CatalogVersion = namedtuple('CatalogVersion', ['number', 'last_modified'])
+CatalogEntry = namedtuple(
+    'CatalogEntry', ['version', 'etag', 'body', 'gzip_body'])
+
+
+def load_catalog_version():
+    """Версия каталога из основной базы: число строк и время последнего
+    изменения тегов и ингредиентов.
+
+    Её одинаково вычисляют все процессы, поэтому изменения без сигналов
+    (bulk_create из другого процесса) тоже меняют версию.
+    """
+    with read_from(None):
+        state = [
+            model.objects.aggregate(
+                count=Count('pk'), updated=Max('updated_at'))
+            for model in (Tag, Ingredient)
+        ]
+    updated = [item['updated'] for item in state if item['updated']]
+    return CatalogVersion(
+        number=int(hashlib.md5(repr(state).encode()).hexdigest()[:15], 16),
+        last_modified=int(max(updated).timestamp()) if updated else 0,
+    )
+
+
+def get_catalog_version():
+    """Версия каталога; процесс с локальным кэшем видит чужие изменения
+    не позже чем через CATALOG_VERSION_TIMEOUT."""
+    return cache.get_or_set(CATALOG_VERSION_KEY, load_catalog_version,
+                            constants.CATALOG_VERSION_TIMEOUT)
+
+
+async def aget_catalog_version():
+    return await cache.aget(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    cache.delete(CATALOG_VERSION_KEY)
+
+
+class IngredientIndex:
+    """Отсортированный по casefold() список ингредиентов для поиска
+    по началу названия через bisect.
+
+    Индекс строится при первом обращении и перестраивается, когда
+    меняется версия каталога. Версия и индекс читаются из основной базы,
+    поэтому изменения из других процессов подхватываются не позже чем
+    через CATALOG_VERSION_TIMEOUT, а отстающая реплика не попадает
+    в индекс новой версии.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = []
+        self._items = []
+
+    def _build(self, version):
+        with read_from(None):
+            rows = sorted(
+                (name.casefold(), pk, name, measurement_unit)
+                for pk, name, measurement_unit
+                in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit').iterator()
+            )
+        self._keys = [row[0] for row in rows]
+        self._items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        self._version = version
+
+    def _ensure_fresh(self):
+        version = get_catalog_version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._build(version)
+
+    @property
+    def version(self):
+        return self._version
+
+    def search(self, prefix):
+        self._ensure_fresh()
+        return self.lookup(prefix)
+
+    def lookup(self, prefix):
+        """Поиск без проверки версии: для вызова из асинхронного кода,
+        который сам сверил версию индекса."""
+        keys, items = self._keys, self._items
+        prefix = prefix.casefold()
+        start = index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix):
+            index += 1
+        return sorted(items[start:index],
+                      key=lambda item: item['name'].casefold() != prefix)
+
+
+ingredient_index = IngredientIndex()
+
+
+class CatalogResponseCache:
+    """Сериализованные и сжатые ответы каталога для текущей версии."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get_cached(self, name, version):
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == version:
+            return entry
+        return None
+
+    def get(self, name, queryset, serializer_class):
+        version = get_catalog_version()
+        entry = self._entries.get(name)
+        if entry is None or entry.version != version:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is None or entry.version != version:
+                    # Поля сериализаторов каталога - поля модели,
+                    # поэтому список строится прямо из values(),
+                    # как и версия, по основной базе.
+                    with read_from(None):
+                        body = FastJSONRenderer().render(list(
+                            queryset.values(*serializer_class.Meta.fields)))
+                    entry = CatalogEntry(
+                        version=version,
+                        etag=f'"{name}-{version.number:x}"',
+                        body=body,
+                        gzip_body=gzip.compress(body),
+                    )
+                    self._entries[name] = entry
+        return entry
+
+
+catalog_responses = CatalogResponseCache()
+
+
+class CatalogListMixin:
+    """Отдаёт полный список каталога из CatalogResponseCache
+    с поддержкой условных GET-запросов."""
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return catalog_response(request, catalog_responses.get(
+            self.basename, self.get_queryset(), self.get_serializer_class()))
+
+
+def catalog_response(request, entry):
+    last_modified = entry.version.last_modified
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(
+            entry.gzip_body, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(
+            entry.body, content_type='application/json')
+    response['ETag'] = entry.etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return get_conditional_response(
+        request, etag=entry.etag, last_modified=last_modified,
+        response=response)
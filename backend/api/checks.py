@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Версии пользователей, каталога и областей кэша ответов должны
+    быть общими для всех воркеров."""
+    if settings.SHARED_CACHE:
+        return []
+    return [Error(
+        f'{settings.CACHES["default"]["BACKEND"]} виден только одному '
+        f'процессу.',
+        hint='Укажите CACHE_BACKEND и CACHE_LOCATION общего кэша, '
+             'например django.core.cache.backends.redis.RedisCache.',
+        id='api.E001',
+    )]
@@ -0,0 +1,87 @@
+import hashlib
+
+from django.core.cache import cache
+
+from api.catalog import get_catalog_version
+from api.response_cache import author_scope, get_scope_versions, recipe_scope
+from foodgram import constants
+from foodgram.db_router import read_from, replica_alias
+from recipes.models import Recipe
+
+FRAGMENT_KEY = 'recipe_fragment:{digest}'
+
+
+def get_request_fragments(request):
+    """Фрагменты, уже полученные за время запроса."""
+    if request is None:
+        return {}
+    http_request = getattr(request, '_request', request)
+    fragments = getattr(http_request, 'recipe_fragments', None)
+    if fragments is None:
+        fragments = http_request.recipe_fragments = {}
+    return fragments
+
+
+def get_fragment_keys(recipes, request, variant):
+    versions = get_scope_versions(
+        {scope for recipe in recipes
+         for scope in (recipe_scope(recipe.pk),
+                       author_scope(recipe.author_id))})
+    # Ссылки на изображения абсолютные, поэтому адрес сайта входит
+    # в ключ вместе с версиями рецепта, автора и справочников.
+    prefix = (request.build_absolute_uri('/') if request is not None
+              else '', variant, get_catalog_version())
+    return {
+        recipe.pk: FRAGMENT_KEY.format(digest=hashlib.md5(repr((
+            *prefix,
+            recipe.pk,
+            versions[recipe_scope(recipe.pk)],
+            versions[author_scope(recipe.author_id)],
+        )).encode()).hexdigest())
+        for recipe in recipes
+    }
+
+
+def build_from_primary(recipes, build):
+    """Строит фрагменты по основной базе.
+
+    Ключи уже содержат версии после записи, а отстающая реплика могла
+    вернуть старые строки. Возвращает фрагменты и id рецептов, которые
+    можно кэшировать: удалённые на основной базе строятся как есть,
+    но в кэш не попадают.
+    """
+    if not recipes:
+        return {}, set()
+    if replica_alias.get() is None:
+        return build(recipes), {recipe.pk for recipe in recipes}
+    with read_from(None):
+        primary = Recipe.objects.in_bulk([recipe.pk for recipe in recipes])
+        return (build([primary.get(recipe.pk, recipe) for recipe in recipes]),
+                primary.keys())
+
+
+def load_fragments(recipes, request, variant, build):
+    """Не зависящие от пользователя части карточек рецептов.
+
+    Возвращает {id рецепта: фрагмент}. Фрагменты берутся из памяти
+    запроса или одним get_many из кэша, недостающие строит
+    build(recipes) по основной базе и кэш пополняется ими.
+    """
+    loaded = get_request_fragments(request)
+    missing = [recipe for recipe in recipes
+               if (variant, recipe.pk) not in loaded]
+    if missing:
+        keys = get_fragment_keys(missing, request, variant)
+        cached = cache.get_many(keys.values())
+        built, cacheable = build_from_primary(
+            [recipe for recipe in missing if keys[recipe.pk] not in cached],
+            build)
+        if cacheable:
+            cache.set_many(
+                {keys[pk]: built[pk] for pk in cacheable},
+                constants.RECIPE_FRAGMENT_CACHE_TIMEOUT)
+        for recipe in missing:
+            loaded[variant, recipe.pk] = (
+                built[recipe.pk] if recipe.pk in built
+                else cached[keys[recipe.pk]])
+    return {recipe.pk: loaded[variant, recipe.pk] for recipe in recipes}
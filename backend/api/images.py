@@ -0,0 +1,150 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, ImageOps
+
+from api.authentication import forget_cached_user
+from api.response_cache import (bump_scopes, get_author_scopes,
+                                get_recipe_scopes)
+from foodgram import constants
+
+VARIANT_FORMATS = {
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+}
+
+logger = logging.getLogger(__name__)
+
+image_executor = ThreadPoolExecutor(max_workers=constants.IMAGE_WORKERS)
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def needs_variants(instance, field_name):
+    variants = getattr(instance, variants_field(field_name))
+    return getattr(instance, field_name).name != variants.get('source', '')
+
+
+def log_failure(future):
+    exception = future.exception()
+    if exception is not None:
+        logger.error('Фоновая задача уменьшенных копий завершилась с '
+                     'ошибкой', exc_info=exception)
+
+
+def submit_variants(model, pk, field_name):
+    try:
+        future = image_executor.submit(build_variants, model, pk, field_name)
+    except RuntimeError:
+        # Пул уже остановлен: процесс завершается.
+        logger.exception('Не удалось запланировать уменьшенные копии %s '
+                         '%s.%s, их создаст build_image_variants',
+                         model.__name__, pk, field_name)
+        return
+    future.add_done_callback(log_failure)
+
+
+def schedule_variants(instance, field_name):
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: submit_variants(model, pk, field_name))
+
+
+def encode_variant(image, file_format):
+    if file_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, file_format,
+               quality=constants.IMAGE_VARIANT_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def delete_variants(storage, variants):
+    for variant in constants.IMAGE_VARIANTS:
+        for path in variants.get(variant, {}).values():
+            storage.delete(path)
+
+
+def build_variants(model, pk, field_name):
+    """Создаёт уменьшенные копии изображения в фоновом потоке или из
+    build_image_variants. Возвращает True, если копии сохранены."""
+    close_old_connections()
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None or not needs_variants(instance, field_name):
+            return False
+        field_file = getattr(instance, field_name)
+        old_variants = getattr(instance, variants_field(field_name))
+        variants = {'source': field_file.name}
+        if field_file:
+            with field_file.open('rb') as file:
+                image = ImageOps.exif_transpose(Image.open(file))
+                image.load()
+            directory, filename = os.path.split(field_file.name)
+            stem = os.path.splitext(filename)[0]
+            for variant, size in constants.IMAGE_VARIANTS.items():
+                resized = image.copy()
+                resized.thumbnail(size)
+                variants[variant] = {
+                    extension: field_file.storage.save(
+                        f'{directory}/variants/{stem}_{variant}.{extension}',
+                        encode_variant(resized, file_format))
+                    for extension, file_format in VARIANT_FORMATS.items()
+                }
+        updated = model.objects.filter(
+            pk=pk, **{field_name: field_file.name}
+        ).update(**{variants_field(field_name): variants})
+        # update() не отправляет сигналов, поэтому кэши ответов и
+        # фрагментов сбрасываются здесь.
+        if updated and model._meta.label == settings.AUTH_USER_MODEL:
+            forget_cached_user(pk)
+            bump_scopes(get_author_scopes(pk))
+        elif updated:
+            bump_scopes(get_recipe_scopes([pk]))
+        delete_variants(field_file.storage,
+                        old_variants if updated else variants)
+        return bool(updated)
+    except Exception:
+        logger.exception('Не удалось обработать %s %s.%s, повторите '
+                         'build_image_variants',
+                         model.__name__, pk, field_name)
+        return False
+    finally:
+        close_old_connections()
+
+
+def get_image_url(storage, name, variants, variant, request):
+    """Выбор ссылки для VariantImageField и api.projections."""
+    if not name:
+        return None
+    path = variants.get(variant, {}).get(settings.IMAGE_VARIANT_FORMAT)
+    if variants.get('source') != name or path is None:
+        path = name
+    url = storage.url(path)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+class VariantImageField(Base64ImageField):
+    """Base64ImageField, который отдаёт ссылку на уменьшенную копию,
+    если она уже готова, и на оригинал в противном случае."""
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return get_image_url(
+            value.storage, value.name,
+            getattr(value.instance, variants_field(self.source), {}),
+            self.variant, self.context.get('request'))
@@ -1,5 +1,163 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class PageLimitPagination(PageNumberPagination):
+    """Постраничная пагинация с курсорным режимом по запросу.
+
+    Если в запросе есть параметр cursor (для первой страницы - пустой),
+    а у view задан cursor_ordering, страница выбирается по ключу
+    последней записи (WHERE (name, id) > ...), без COUNT(*) и OFFSET.
+    Поле ключа с префиксом «-» идёт по убыванию.
+    Параметр count=approx|exact добавляет оценку или точное число
+    записей.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = getattr(view, 'cursor_ordering', None)
+        if (self.keyset is None
+                or self.cursor_query_param not in request.query_params):
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_keyset(queryset, request)
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_cursor_link(self.next_position, False)),
+            ('previous', self.get_cursor_link(self.previous_position, True)),
+            ('results', data),
+        ]))
+
+    def paginate_keyset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, ''), queryset)
+        self.count = self.get_count(queryset, request)
+        queryset = queryset.order_by(*(
+            self.flip(field) if reverse else field
+            for field in self.keyset))
+        if position is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(position, reverse))
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+        has_next = position is not None if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+        self.next_position = (
+            self.get_position(results[-1]) if has_next and results else None)
+        self.previous_position = (
+            self.get_position(results[0])
+            if has_previous and results else None)
+        return results
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def keyset_filter(self, position, reverse):
+        names = [field.lstrip('-') for field in self.keyset]
+        condition = Q()
+        for index, field in enumerate(self.keyset):
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= Q(
+                **dict(zip(names[:index], position[:index])),
+                **{f'{names[index]}__{lookup}': position[index]}
+            )
+        return condition
+
+    def get_position(self, obj):
+        position = []
+        for field in self.keyset:
+            value = getattr(obj, field.lstrip('-'))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def get_keyset_fields(self, queryset):
+        """Поля ключа; для аннотаций (feed_date ленты) - их output_field."""
+        annotations = queryset.query.annotations
+        return [
+            annotations[name].output_field if name in annotations
+            else queryset.model._meta.get_field(name)
+            for name in (field.lstrip('-') for field in self.keyset)
+        ]
+
+    def decode_cursor(self, cursor, queryset):
+        """Позиция из курсора; значения приводятся to_python() полей
+        ключа, поэтому подделанный курсор даёт 404, а не 500."""
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = data['p'], bool(data['r'])
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(
+                self.keyset):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                field.to_python(value) for field, value in zip(
+                    self.get_keyset_fields(queryset), position)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        return base64.urlsafe_b64encode(json.dumps(
+            {'p': position, 'r': int(reverse)}).encode()).decode()
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(position, reverse))
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        connection = connections[queryset.db]
+        if mode == 'approx' and connection.vendor == 'postgresql':
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                return cursor.fetchone()[0][0]['Plan']['Plan Rows']
+        if mode in ('approx', 'exact'):
+            return queryset.count()
+        return None
+
+
+class FeedPagination(PageLimitPagination):
+    """Лента всегда листается курсором: от новых рецептов к старым."""
+    cursor_ordering = ('-feed_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_ordering
+        return self.paginate_keyset(queryset, request)
@@ -0,0 +1,115 @@
+"""Ответы горячих запросов чтения без полей DRF.
+
+Словари собираются прямо из .values() и результатов prefetch в том же
+порядке ключей и с теми же значениями, что у RecipeGetSerializer,
+UserSubscribtionGetSerializer и сериализаторов каталога, поэтому JSON
+совпадает байт в байт. Совпадение и соответствие
+docs/openapi-schema.yml проверяет команда bench_serialization.
+"""
+from collections import defaultdict
+
+from api.images import get_image_url
+from api.relations import get_relations
+from recipes.models import Recipe, RecipeIngredient
+from users.models import User
+
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+avatar_storage = User._meta.get_field('avatar').storage
+image_storage = Recipe._meta.get_field('image').storage
+
+
+def get_user_values(user):
+    values = {field: getattr(user, field) for field in USER_FIELDS}
+    values['avatar'] = user.avatar.name
+    values['avatar_variants'] = user.avatar_variants
+    return values
+
+
+def project_user(values, is_subscribed, request):
+    data = {field: values[field] for field in USER_FIELDS}
+    data['is_subscribed'] = is_subscribed
+    data['avatar'] = get_image_url(
+        avatar_storage, values['avatar'], values['avatar_variants'],
+        'thumbnail', request)
+    return data
+
+
+def project_recipe_fragments(recipes, request, variant):
+    """Фрагменты карточек (см. api.fragments) для пачки рецептов:
+    по одному запросу на авторов, теги и ингредиенты."""
+    if not recipes:
+        return {}
+    recipe_ids = [recipe.pk for recipe in recipes]
+    authors = {
+        values['id']: project_user(values, None, request)
+        for values in User.objects.filter(
+            pk__in={recipe.author_id for recipe in recipes}
+        ).values(*USER_FIELDS, 'avatar', 'avatar_variants')
+    }
+    tags = defaultdict(list)
+    for recipe_id, pk, name, slug in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids).order_by('tag_id').values_list(
+                'recipe_id', 'tag_id', 'tag__name', 'tag__slug'):
+        tags[recipe_id].append({'id': pk, 'name': name, 'slug': slug})
+    ingredients = defaultdict(list)
+    for recipe_id, pk, name, unit, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids).order_by('pk').values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'):
+        ingredients[recipe_id].append({
+            'id': pk, 'name': name, 'measurement_unit': unit,
+            'amount': amount})
+    return {
+        recipe.pk: {
+            'id': recipe.pk,
+            'tags': tags[recipe.pk],
+            'author': authors[recipe.author_id],
+            'ingredients': ingredients[recipe.pk],
+            'is_favorited': None,
+            'is_in_shopping_cart': None,
+            'name': recipe.name,
+            'image': get_image_url(
+                image_storage, recipe.image.name, recipe.image_variants,
+                variant, request),
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+        for recipe in recipes
+    }
+
+
+def add_viewer_flags(fragment, recipe, relations):
+    """Карточка рецепта из фрагмента и связей текущего пользователя."""
+    data = dict(fragment)
+    data['author'] = dict(fragment['author'], is_subscribed=relations.get(
+        'is_subscribed', recipe.author_id))
+    data['is_favorited'] = relations.get('is_favorited', recipe.pk)
+    data['is_in_shopping_cart'] = relations.get(
+        'is_in_shopping_cart', recipe.pk)
+    return data
+
+
+def project_subscriptions(authors, request):
+    """Страница подписок; рецепты авторов берутся из limited_recipes."""
+    relations = get_relations(request)
+    relations.load_users(authors)
+    return [
+        {
+            **project_user(get_user_values(author), relations.get(
+                'is_subscribed', author.pk), request),
+            'recipes': [
+                {
+                    'id': recipe.pk,
+                    'name': recipe.name,
+                    'image': get_image_url(
+                        image_storage, recipe.image.name,
+                        recipe.image_variants, 'thumbnail', request),
+                    'cooking_time': recipe.cooking_time,
+                }
+                for recipe in author.limited_recipes
+            ],
+            'recipes_count': author.recipes_count,
+        }
+        for author in authors
+    ]
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F, Value
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RELATIONS = {
+    'is_subscribed': (Subscription, 'author_id'),
+    'is_favorited': (Favorite, 'recipe_id'),
+    'is_in_shopping_cart': (ShoppingCart, 'recipe_id'),
+}
+
+
+class RelationContext:
+    """Подписки, избранное и корзина текущего пользователя.
+
+    Связи загружаются одним запросом для всех ещё не проверенных id
+    страницы, дальше сериализаторы берут ответы из памяти.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.known = {name: {} for name in RELATIONS}
+
+    def load(self, ids_by_relation):
+        missing = {}
+        for name, ids in ids_by_relation.items():
+            ids = {pk for pk in ids if pk not in self.known[name]}
+            if ids:
+                missing[name] = ids
+        if not missing:
+            return
+        found = set()
+        if self.user.is_authenticated:
+            queries = [
+                RELATIONS[name][0].objects.filter(
+                    user=self.user,
+                    **{f'{RELATIONS[name][1]}__in': ids}
+                ).order_by().annotate(
+                    relation=Value(name),
+                    object_id=F(RELATIONS[name][1]),
+                ).values_list('relation', 'object_id')
+                for name, ids in missing.items()
+            ]
+            found = set(queries[0].union(*queries[1:], all=True))
+        for name, ids in missing.items():
+            for pk in ids:
+                self.known[name][pk] = (name, pk) in found
+
+    def remember(self, name, ids, value):
+        for pk in ids:
+            self.known[name][pk] = value
+
+    def get(self, name, pk):
+        if pk not in self.known[name]:
+            self.load({name: [pk]})
+        return self.known[name][pk]
+
+    def load_recipes(self, recipes):
+        recipe_ids = [recipe.pk for recipe in recipes]
+        self.load({
+            'is_favorited': recipe_ids,
+            'is_in_shopping_cart': recipe_ids,
+            'is_subscribed': [recipe.author_id for recipe in recipes],
+        })
+
+    def load_users(self, users):
+        self.load({'is_subscribed': [user.pk for user in users]})
+
+
+def get_relations(request):
+    """Общий для всех сериализаторов запроса RelationContext."""
+    if request is None:
+        return RelationContext(AnonymousUser())
+    http_request = getattr(request, '_request', request)
+    relations = getattr(http_request, 'relations', None)
+    if relations is None:
+        relations = http_request.relations = RelationContext(request.user)
+    return relations
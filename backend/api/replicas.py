@@ -0,0 +1,77 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.db_router import choose_replica, replica_alias, replica_health
+
+PRIMARY_PIN_KEY = 'db_primary_pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """После записи пользователь читает с основной базы, пока реплики
+    не догонят её."""
+    if user.is_authenticated and settings.DATABASE_REPLICAS:
+        cache.set(PRIMARY_PIN_KEY.format(user_id=user.pk), True,
+                  settings.REPLICA_STICKY_SECONDS)
+
+
+def get_read_replica(user):
+    if not settings.DATABASE_REPLICAS or (
+            user.is_authenticated
+            and cache.get(PRIMARY_PIN_KEY.format(user_id=user.pk))):
+        return None
+    return choose_replica()
+
+
+async def aget_read_replica(user):
+    if not settings.DATABASE_REPLICAS or (
+            user.is_authenticated
+            and await cache.aget(PRIMARY_PIN_KEY.format(user_id=user.pk))):
+        return None
+    return await sync_to_async(choose_replica)()
+
+
+class ReplicaReadMixin:
+    """Чтение безопасными методами идёт в реплику, запись закрепляет
+    пользователя за основной базой на REPLICA_STICKY_SECONDS.
+
+    Если реплика перестала отвечать посреди запроса, он повторяется
+    на основной базе. Алиас реплики сбрасывается и тогда, когда DRF
+    не обработал исключение и finalize_response не вызывался.
+    """
+    replica_token = None
+    use_primary = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not self.use_primary:
+            alias = get_read_replica(request.user)
+            if alias is not None:
+                self.replica_token = replica_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self.reset_replica()
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def reset_replica(self):
+        if self.replica_token is not None:
+            replica_alias.reset(self.replica_token)
+            self.replica_token = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except DatabaseError:
+            alias = replica_alias.get()
+            if self.replica_token is None or alias is None:
+                raise
+            self.reset_replica()
+            replica_health.mark_down(alias)
+            self.use_primary = True
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            self.reset_replica()
@@ -0,0 +1,130 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.catalog import get_catalog_version
+from foodgram import constants
+from foodgram.db_router import read_from
+from recipes.models import Recipe, Tag
+
+SCOPE_VERSION_KEY = 'recipe_scope_version:{scope}'
+RESPONSE_KEY = 'recipe_response:{digest}'
+ALL_SCOPE = 'all'
+CACHED_LIST_PARAMS = ('page', 'limit', 'author', 'search', 'count')
+
+
+def recipe_scope(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def tag_scope(slug):
+    return f'tag:{slug}'
+
+
+def bump_scopes(scopes):
+    version = time.time_ns()
+    cache.set_many(
+        {SCOPE_VERSION_KEY.format(scope=scope): version
+         for scope in set(scopes)},
+        None
+    )
+
+
+def get_scope_versions(scopes):
+    """Версии областей кэша; отсутствующие заводятся заново."""
+    keys = {scope: SCOPE_VERSION_KEY.format(scope=scope) for scope in scopes}
+    versions = cache.get_many(keys.values())
+    missing = {key: time.time_ns()
+               for key in keys.values() if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {scope: versions[key] for scope, key in keys.items()}
+
+
+def get_recipe_scopes(recipe_ids):
+    """Области кэша, которые затрагивает изменение рецептов."""
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).values_list(
+        'author_id', 'tags__slug')
+    scopes = {ALL_SCOPE, *map(recipe_scope, recipe_ids)}
+    for author_id, slug in recipes:
+        scopes.add(author_scope(author_id))
+        if slug is not None:
+            scopes.add(tag_scope(slug))
+    return scopes
+
+
+def get_author_scopes(author_id):
+    recipe_ids = list(Recipe.objects.filter(
+        author_id=author_id).values_list('id', flat=True))
+    if not recipe_ids:
+        return set()
+    return {ALL_SCOPE, author_scope(author_id),
+            *map(recipe_scope, recipe_ids),
+            *map(tag_scope, Tag.objects.values_list('slug', flat=True))}
+
+
+def get_list_scopes(request):
+    params = request.query_params
+    tags = sorted(set(params.getlist('tags')))
+    author = params.get('author')
+    scopes = [tag_scope(slug) for slug in tags]
+    if author:
+        scopes.append(author_scope(author))
+    if not scopes or params.get('search'):
+        scopes.append(ALL_SCOPE)
+    normalized = [(name, params.get(name)) for name in CACHED_LIST_PARAMS
+                  if params.get(name)]
+    normalized.append(('cursor', params.get('cursor')))
+    normalized.append(('tags', tags))
+    return scopes, normalized
+
+
+class AnonymousCacheMixin:
+    """Кэширует ответы list/retrieve для анонимных пользователей.
+
+    Ключ ответа включает версии областей (весь список, автор, теги,
+    рецепт), поэтому изменение рецепта сбрасывает только затронутые
+    страницы.
+    """
+
+    def list(self, request, *args, **kwargs):
+        scopes, normalized = get_list_scopes(request)
+        return self.cached_response(
+            scopes, normalized, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            [recipe_scope(kwargs.get(self.lookup_field))], [],
+            super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, scopes, normalized, view,
+                        request, *args, **kwargs):
+        if (request.user.is_authenticated
+                or request.accepted_renderer.format != 'json'):
+            return view(request, *args, **kwargs)
+        digest = hashlib.md5(repr((
+            request.build_absolute_uri(request.path),
+            normalized,
+            get_catalog_version(),
+            sorted(get_scope_versions(scopes).items()),
+        )).encode()).hexdigest()
+        key = RESPONSE_KEY.format(digest=digest)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        # Ключ уже содержит версии после записи, поэтому промах читает
+        # основную базу: ответ отстающей реплики остался бы в кэше.
+        with read_from(None):
+            response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data,
+                      constants.RECIPE_RESPONSE_CACHE_TIMEOUT)
+        return response
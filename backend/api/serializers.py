@@ -1,9 +1,18 @@
+from collections import Counter
+
+from django.db import models
 from django.db.transaction import atomic
 
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.fragments import load_fragments
+from api.images import VariantImageField
+from api.projections import add_viewer_flags, project_recipe_fragments
+from api.relations import get_relations
+from api.utils import get_recipes_limit
+from foodgram import constants
 from recipes.models import (Favorite, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
 from users.models import (User, Subscription)
@@ -17,48 +26,57 @@ class UserSignUpSerializer(serializers.ModelSerializer):
                   'last_name', 'password']
 
 
+class PreparedListSerializer(serializers.ListSerializer):
+    """Вызывает child.prepare() для всей страницы, чтобы связи
+    пользователя и кэш загружались пачкой, а не для каждого объекта."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(
+            data, models.manager.BaseManager) else data
+        items = list(iterable)
+        self.child.prepare(items)
+        return super().to_representation(items)
+
+
 class UserGetSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(required=False)
+    avatar = VariantImageField(variant='thumbnail', required=False)
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ['email', 'id', 'username', 'first_name',
                   'last_name', 'is_subscribed', 'avatar']
+        list_serializer_class = PreparedListSerializer
+
+    def prepare(self, users):
+        get_relations(self.context.get('request')).load_users(users)
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return bool(
-            request
-            and request.user.is_authenticated
-            and Subscription.objects.filter(user=request.user, author=obj
-                                            ).exists())
+        return get_relations(self.context.get('request')).get(
+            'is_subscribed', obj.pk)
 
 
 class UserSubscribtionGetSerializer(UserGetSerializer):
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = User
         fields = UserGetSerializer.Meta.fields + ['recipes', 'recipes_count']
         read_only_fields = fields
+        list_serializer_class = PreparedListSerializer
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return RecipeSmallSerializer(recipes, many=True,
                                      context={'request': request}).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class UserSubscribeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -82,6 +100,8 @@ class UserSubscribeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         request = self.context.get('request')
+        get_relations(request).remember(
+            'is_subscribed', [instance.author_id], True)
         return UserSubscribtionGetSerializer(
             instance.author, context={'request': request}
         ).data
@@ -133,9 +153,8 @@ class IngredientGetSerializer(serializers.ModelSerializer):
 
 
 class IngredientPostSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
+    id = serializers.IntegerField(
+        source='ingredient_id'
     )
 
     class Meta:
@@ -144,7 +163,7 @@ class IngredientPostSerializer(serializers.ModelSerializer):
 
 
 class RecipeSmallSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(required=True)
+    image = VariantImageField(variant='thumbnail', required=True)
 
     class Meta:
         model = Recipe
@@ -166,7 +185,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField(
+    image = VariantImageField(
+        variant='card',
         required=True
     )
 
@@ -175,22 +195,38 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         fields = ['id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart', 'name',
                   'image', 'text', 'cooking_time']
+        list_serializer_class = PreparedListSerializer
 
-    def get_is_favorited(self, obj):
+    def get_fields(self):
+        fields = super().get_fields()
+        view = self.context.get('view')
+        if view is not None and view.action == 'retrieve':
+            fields['image'].variant = 'full'
+        return fields
+
+    def prepare(self, recipes):
+        """Загружает связи пользователя и фрагменты карточек recipes."""
         request = self.context.get('request')
-        return bool(
-            request
-            and request.user.is_authenticated
-            and Favorite.objects.filter(
-                user=request.user, recipe=obj).exists())
+        get_relations(request).load_recipes(recipes)
+        return load_fragments(recipes, request, self.fields['image'].variant,
+                              self.build_fragments)
+
+    def build_fragments(self, recipes):
+        return project_recipe_fragments(
+            recipes, self.context.get('request'), self.fields['image'].variant)
+
+    def to_representation(self, instance):
+        return add_viewer_flags(
+            self.prepare([instance])[instance.pk], instance,
+            get_relations(self.context.get('request')))
+
+    def get_is_favorited(self, obj):
+        return get_relations(self.context.get('request')).get(
+            'is_favorited', obj.pk)
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        return bool(
-            request
-            and request.user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user=request.user, recipe=obj).exists())
+        return get_relations(self.context.get('request')).get(
+            'is_in_shopping_cart', obj.pk)
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -198,9 +234,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         many=True,
         source='recipe_ingredients',
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
         allow_null=False,
     )
     image = Base64ImageField(
@@ -218,6 +253,21 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 'Поле image - пустое')
         return value
 
+    @staticmethod
+    def get_id_errors(ids, model, messages):
+        if not ids:
+            return [messages['empty']]
+        errors = []
+        duplicates = sorted(pk for pk, total in Counter(ids).items()
+                            if total > 1)
+        if duplicates:
+            errors.append(f'{messages["duplicates"]}: {duplicates}')
+        missing = sorted(set(ids) - set(model.objects.filter(
+            pk__in=ids).values_list('pk', flat=True)))
+        if missing:
+            errors.append(f'{messages["missing"]}: {missing}')
+        return errors
+
     def validate(self, data):
         if data.get('recipe_ingredients') is None:
             raise serializers.ValidationError(
@@ -225,36 +275,37 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         if data.get('tags') is None:
             raise serializers.ValidationError(
                 'Не переданно поля tags')
-        ingredients_list = []
-        tags_list = []
-        for ingredient in data.get('recipe_ingredients'):
-            ingredients_list.append(ingredient.get('ingredient').id)
-        if not ingredients_list:
-            raise serializers.ValidationError(
-                'Вы пытаетесь добавить рецепт без ингредиентов'
-            )
-        if len(set(ingredients_list)) != len(ingredients_list):
-            raise serializers.ValidationError(
-                'Вы пытаетесь добавить в рецепт '
-                'несколько одинаковых ингредиентов'
-            )
-        for tag in data.get('tags'):
-            tags_list.append(tag)
-        if not tags_list:
-            raise serializers.ValidationError(
-                'Вы пытаетесь добавить рецепт без тега'
-            )
-        if len(set(tags_list)) != len(tags_list):
-            raise serializers.ValidationError(
-                'Вы пытаетесь добавить в рецепт несколько одинаковых тегов'
-            )
+        errors = {}
+        ingredient_errors = self.get_id_errors(
+            [ingredient['ingredient_id']
+             for ingredient in data['recipe_ingredients']],
+            Ingredient,
+            {'empty': 'Вы пытаетесь добавить рецепт без ингредиентов',
+             'duplicates': 'Вы пытаетесь добавить в рецепт '
+                           'несколько одинаковых ингредиентов',
+             'missing': 'Ингредиенты не найдены'}
+        )
+        if ingredient_errors:
+            errors['ingredients'] = ingredient_errors
+        tag_errors = self.get_id_errors(
+            data['tags'],
+            Tag,
+            {'empty': 'Вы пытаетесь добавить рецепт без тега',
+             'duplicates': 'Вы пытаетесь добавить в рецепт '
+                           'несколько одинаковых тегов',
+             'missing': 'Теги не найдены'}
+        )
+        if tag_errors:
+            errors['tags'] = tag_errors
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
     @staticmethod
     def create_ingredients(ingredients, recipe):
         ingredient_list = []
         for ingredient in ingredients:
-            ingredient_id = ingredient.get('ingredient').id
+            ingredient_id = ingredient.get('ingredient_id')
             amount = ingredient.get('amount')
             ingredient_list.append(
                 RecipeIngredient(
@@ -277,14 +328,42 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients_data, recipe)
         return recipe
 
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        incoming = {ingredient.get('ingredient_id'): ingredient.get('amount')
+                    for ingredient in ingredients}
+        current = {item.ingredient_id: item
+                   for item in recipe.recipe_ingredients.all()}
+        removed = current.keys() - incoming.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = incoming.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = [
+            RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                             amount=amount)
+            for ingredient_id, amount in incoming.items()
+            if ingredient_id not in current
+        ]
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+
     @atomic
     def update(self, instance, validated_data):
-        ingredients_data = validated_data.pop('recipe_ingredients', [])
-        tags_data = validated_data.pop('tags', [])
+        ingredients_data = validated_data.pop('recipe_ingredients', None)
+        tags_data = validated_data.pop('tags', None)
         instance = super().update(instance, validated_data)
-        instance.tags.set(tags_data)
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients_data, instance)
+        if tags_data is not None:
+            instance.tags.set(tags_data)
+        if ingredients_data is not None:
+            self.update_ingredients(ingredients_data, instance)
         return instance
 
     def to_representation(self, instance):
@@ -315,6 +394,17 @@ class FavoriteSerializer(serializers.ModelSerializer):
         ).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=constants.MAX_BULK_RECIPES,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
 class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
@@ -0,0 +1,169 @@
+import codecs
+import csv
+import io
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from foodgram import constants
+from recipes.models import RecipeIngredient
+
+CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+SHOPPING_LIST_KEY = 'shopping_list:{user_id}:{version}'
+PDF_FONT_NAME = 'ShoppingListFont'
+TITLE = 'Список покупок:'
+
+
+def get_cart_version(user_id):
+    return cache.get_or_set(
+        CART_VERSION_KEY.format(user_id=user_id),
+        lambda: uuid.uuid4().hex,
+        None
+    )
+
+
+def bump_cart_versions(user_ids):
+    cache.set_many(
+        {CART_VERSION_KEY.format(user_id=user_id): uuid.uuid4().hex
+         for user_id in set(user_ids)},
+        None
+    )
+
+
+def iter_ingredients(user):
+    """Суммарные ингредиенты корзины: из кэша или курсором из БД."""
+    key = SHOPPING_LIST_KEY.format(
+        user_id=user.id, version=get_cart_version(user.id))
+    rows = cache.get(key)
+    if rows is not None:
+        yield from rows
+        return
+    rows = []
+    # Строки попадут в кэш под новой версией корзины, поэтому читаются
+    # с основной базы. Генератор дочитывается уже после view, где
+    # read_from() не действует.
+    ingredients = RecipeIngredient.objects.using(DEFAULT_DB_ALIAS).filter(
+        recipe__shoppingcarts__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        ingredient_amount=Sum('amount')
+    ).order_by('ingredient__name')
+    for ingredient in ingredients.iterator(
+            chunk_size=constants.SHOPPING_LIST_CHUNK_ROWS):
+        row = (ingredient['ingredient__name'],
+               ingredient['ingredient__measurement_unit'],
+               ingredient['ingredient_amount'])
+        rows.append(row)
+        yield row
+    cache.set(key, rows, constants.SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def encode_chunks(lines):
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        chunk.append(data)
+        size += len(data)
+        if size >= constants.SHOPPING_LIST_CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def render_txt(rows):
+    yield f'{TITLE}\n'
+    for name, unit, amount in rows:
+        yield f'\n{name} - {amount} {unit}., '
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield codecs.BOM_UTF8.decode()
+    yield writer.writerow(['name', 'measurement_unit', 'amount'])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        return 'Helvetica'
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT))
+    return PDF_FONT_NAME
+
+
+def build_pdf(rows):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    width, height = A4
+    margin = 50
+    line_height = 18
+    y = height - margin
+    pdf.setFont(font, 16)
+    pdf.drawString(margin, y, TITLE)
+    pdf.setFont(font, 12)
+    for name, unit, amount in rows:
+        y -= line_height
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - margin
+        pdf.drawString(margin, y, f'{name} - {amount} {unit}.')
+    pdf.save()
+    return buffer.getvalue()
+
+
+def render_pdf(rows):
+    """reportlab собирает документ целиком при save(), поэтому PDF
+    строится прямо в потоке, который читает генератор (поток запроса
+    или sync_to_async под ASGI), и отдаётся частями."""
+    content = build_pdf(rows)
+    for start in range(0, len(content), constants.SHOPPING_LIST_CHUNK_SIZE):
+        yield content[start:start + constants.SHOPPING_LIST_CHUNK_SIZE]
+
+
+EXPORT_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+async def aiter_chunks(chunks):
+    """Под ASGI синхронный генератор читается по частям в потоке
+    запроса, иначе Django собрал бы его в памяти целиком."""
+    finished = object()
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, finished)) is not finished:
+        yield chunk
+
+
+def stream_shopping_list(user, file_format, is_async=False):
+    renderer, content_type = EXPORT_FORMATS[file_format]
+    chunks = renderer(iter_ingredients(user))
+    if file_format != 'pdf':
+        chunks = encode_chunks(chunks)
+    if is_async:
+        chunks = aiter_chunks(chunks)
+    return chunks, content_type
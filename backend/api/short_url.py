@@ -1,10 +1,37 @@
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponseRedirect
 
+from api.lru import TimedLRU
+from foodgram import constants
 from recipes.models import Recipe
 
+SHORT_URL_KEY = 'short_url:{short_url}'
+
+short_urls = TimedLRU(constants.SHORT_URL_LRU_SIZE,
+                      constants.SHORT_URL_LRU_TIMEOUT)
+
+
+def resolve_short_url(short_url):
+    recipe_id = short_urls.get(short_url)
+    if recipe_id is not None:
+        return recipe_id
+    key = SHORT_URL_KEY.format(short_url=short_url)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = get_object_or_404(
+            Recipe.objects.values_list('id', flat=True),
+            short_url=short_url)
+        cache.set(key, recipe_id, None)
+    short_urls.set(short_url, recipe_id)
+    return recipe_id
+
+
+def forget_short_url(short_url):
+    short_urls.discard(short_url)
+    cache.delete(SHORT_URL_KEY.format(short_url=short_url))
+
 
 def short_url_redirect(request, short_url):
-    recipe = get_object_or_404(Recipe, short_url=short_url)
-    return HttpResponseRedirect(
-        request.build_absolute_uri(f'/recipes/{recipe.id}/'))
+    return HttpResponseRedirect(request.build_absolute_uri(
+        f'/recipes/{resolve_short_url(short_url)}/'))
@@ -0,0 +1,118 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import forget_cached_user
+from api.catalog import bump_catalog_version
+from api.images import needs_variants, schedule_variants
+from api.response_cache import (bump_scopes, get_author_scopes,
+                                get_recipe_scopes, tag_scope)
+from api.shopping_list import bump_cart_versions
+from api.short_url import forget_short_url
+from recipes.counters import bulk_change_active
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    if bulk_change_active.get():
+        return
+    transaction.on_commit(lambda: bump_cart_versions([instance.user_id]))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_cart_versions(
+        ShoppingCart.objects.filter(
+            recipe_id=instance.id).values_list('user_id', flat=True)))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    if needs_variants(instance, 'image'):
+        schedule_variants(instance, 'image')
+
+
+@receiver(post_save, sender=User)
+def user_avatar_changed(sender, instance, **kwargs):
+    if needs_variants(instance, 'avatar'):
+        schedule_variants(instance, 'avatar')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    if instance.short_url:
+        transaction.on_commit(lambda: forget_short_url(instance.short_url))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_responses_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: bump_scopes(get_recipe_scopes([instance.id])))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_responses_deleted(sender, instance, **kwargs):
+    scopes = get_recipe_scopes([instance.id])
+    transaction.on_commit(lambda: bump_scopes(scopes))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    recipe_id = instance.recipe_id
+    transaction.on_commit(
+        lambda: bump_scopes(get_recipe_scopes([recipe_id])))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        recipe_ids = pk_set or instance.recipe_set.values_list(
+            'id', flat=True)
+        scopes = get_recipe_scopes(list(recipe_ids))
+        scopes.add(tag_scope(instance.slug))
+    else:
+        scopes = get_recipe_scopes([instance.pk])
+        scopes.update(map(tag_scope, Tag.objects.filter(
+            pk__in=pk_set or ()).values_list('slug', flat=True)))
+    transaction.on_commit(lambda: bump_scopes(scopes))
+
+
+@receiver(post_save, sender=User)
+def author_responses_changed(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(
+        lambda: bump_scopes(get_author_scopes(instance.id)))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: forget_cached_user(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=User)
+def cached_user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(lambda: forget_cached_user(instance.id))
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, user, **kwargs):
+    if user is not None:
+        forget_cached_user(user.pk)
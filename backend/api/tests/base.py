@@ -0,0 +1,82 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def make_image(size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def create_user(number, **fields):
+    return User.objects.create_user(
+        email=f'user{number}@example.com',
+        username=f'user{number}',
+        first_name=f'Имя{number}',
+        last_name=f'Фамилия{number}',
+        password='pass12345!',
+        **fields,
+    )
+
+
+def create_recipe(author, name, tags=(), ingredients=(), **fields):
+    """Рецепт через ORM; ingredients - пары (ингредиент, количество)."""
+    fields.setdefault('text', 'Описание')
+    fields.setdefault('cooking_time', 10)
+    recipe = Recipe.objects.create(author=author, name=name, **fields)
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients)
+    return recipe
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+class ApiTestCase(APITestCase):
+    """Временный MEDIA_ROOT на класс и пустой кэш перед каждым тестом."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=name, slug=slug)
+            for name, slug in (('Завтрак', 'breakfast'), ('Обед', 'lunch'),
+                               ('Ужин', 'dinner'))
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number:02d}',
+                                      measurement_unit='г')
+            for number in range(10)
+        ]
+
+    def setUp(self):
+        cache.clear()
@@ -0,0 +1,192 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import OperationalError
+from django.test import AsyncClient, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api import async_views
+from api.replicas import aget_read_replica, pin_to_primary
+from api.tests.base import ApiTestCase, create_recipe, create_user
+from api.urls import router_views
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from foodgram.db_router import replica_alias
+from recipes.models import Favorite
+
+RECIPES_URL = '/api/recipes/'
+
+
+class AsyncViewsTests(ApiTestCase):
+    """Асинхронные view отвечают так же, как синхронные view DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = create_user(1)
+        cls.author = create_user(2)
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipes = [
+            create_recipe(
+                (cls.user, cls.author)[number % 2], f'Рецепт {number}',
+                tags=cls.tags[number % 3:number % 3 + 1],
+                ingredients=[(cls.ingredients[number], number + 1)])
+            for number in range(5)
+        ]
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    def get_sync(self, name, path, params=None, headers=None, **kwargs):
+        request = APIRequestFactory().get(path, params or {},
+                                          **(headers or {}))
+        response = router_views[name](request, **kwargs)
+        # Ответы каталога из кэша - готовые HttpResponse.
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def get_async(self, path, params=None, headers=None):
+        # AsyncClient берёт заголовки только из headers.
+        return await AsyncClient().get(path, params or {}, headers={
+            name[len('HTTP_'):].replace('_', '-').title(): value
+            for name, value in (headers or {}).items()})
+
+    def assertSameResponse(self, response, expected):
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+
+    async def check(self, viewset, name, path, params=None, headers=None,
+                    served_async=True, **kwargs):
+        expected = await sync_to_async(self.get_sync)(
+            name, path, params, headers, **kwargs)
+        # initial() вызывается только синхронным view, до аутентификации.
+        with mock.patch.object(viewset, 'initial', autospec=True,
+                               side_effect=viewset.initial) as initial:
+            response = await self.get_async(path, params, headers)
+        self.assertSameResponse(response, expected)
+        self.assertEqual(initial.called, not served_async)
+        return response
+
+    async def test_recipe_list(self):
+        for params in ({}, {'limit': 2, 'page': 2}, {'tags': 'breakfast'},
+                       {'is_favorited': 1}, {'author': self.author.pk}):
+            with self.subTest(params=params):
+                response = await self.check(
+                    RecipeViewSet, 'recipes-list', RECIPES_URL,
+                    params, self.headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json()['results'])
+
+    async def test_recipe_detail(self):
+        recipe = self.recipes[1]
+        response = await self.check(
+            RecipeViewSet, 'recipes-detail',
+            f'{RECIPES_URL}{recipe.pk}/', headers=self.headers, pk=recipe.pk)
+        self.assertTrue(response.json()['is_favorited'])
+
+    async def test_fallback_to_sync(self):
+        missing = max(recipe.pk for recipe in self.recipes) + 1
+        cases = (
+            ('recipes-list', RECIPES_URL, {'page': 99}, {}),
+            ('recipes-list', RECIPES_URL, {'tags': 'unknown'}, {}),
+            ('recipes-list', RECIPES_URL, {'cursor': 'abc'}, {}),
+            ('recipes-detail', f'{RECIPES_URL}{missing}/', {},
+             {'pk': missing}),
+        )
+        for name, path, params, kwargs in cases:
+            with self.subTest(path=path, params=params):
+                response = await self.check(
+                    RecipeViewSet, name, path, params, self.headers,
+                    served_async=False, **kwargs)
+                self.assertGreaterEqual(response.status_code, 400)
+
+    async def test_anonymous_and_bad_token_use_sync_views(self):
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Token wrong'}):
+            with self.subTest(headers=headers):
+                await self.check(RecipeViewSet, 'recipes-list',
+                                 RECIPES_URL, headers=headers,
+                                 served_async=False)
+
+    async def test_catalog(self):
+        tag, ingredient = self.tags[0], self.ingredients[0]
+        # Списки справочников отдаются асинхронно из кэша, который
+        # заполнил синхронный запрос в check().
+        await self.check(TagViewSet, 'tags-list', '/api/tags/')
+        await self.check(IngredientViewSet, 'ingredients-list',
+                         '/api/ingredients/', {'name': 'Ингредиент 0'})
+        await self.check(TagViewSet, 'tags-detail',
+                         f'/api/tags/{tag.pk}/', pk=tag.pk)
+        await self.check(IngredientViewSet, 'ingredients-detail',
+                         f'/api/ingredients/{ingredient.pk}/',
+                         pk=ingredient.pk)
+        await self.check(TagViewSet, 'tags-detail',
+                         '/api/tags/0/', served_async=False, pk=0)
+
+    async def test_replica_is_used_and_reset(self):
+        aliases = []
+        afetch = async_views.afetch
+
+        async def fetch(queryset):
+            aliases.append(replica_alias.get())
+            return await afetch(queryset)
+
+        with mock.patch('api.async_views.aget_read_replica',
+                        return_value='default') as get_replica, \
+                mock.patch('api.async_views.afetch', fetch):
+            await self.check(RecipeViewSet, 'recipes-list',
+                             RECIPES_URL, headers=self.headers)
+        get_replica.assert_awaited_once()
+        self.assertEqual(aliases, ['default'])
+        self.assertIsNone(replica_alias.get())
+
+    async def test_replica_error_falls_back_to_primary(self):
+        with mock.patch('api.async_views.aget_read_replica',
+                        return_value='default'), \
+                mock.patch('api.async_views.afetch',
+                           side_effect=OperationalError('replica down')), \
+                mock.patch('foodgram.db_router.replica_health') as health:
+            await self.check(RecipeViewSet, 'recipes-list',
+                             RECIPES_URL, headers=self.headers,
+                             served_async=False)
+        health.mark_down.assert_called_once_with('default')
+        self.assertIsNone(replica_alias.get())
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    async def test_pinned_user_reads_primary(self):
+        with mock.patch('api.replicas.choose_replica',
+                        return_value='replica'):
+            self.assertEqual(await aget_read_replica(self.user), 'replica')
+            await sync_to_async(pin_to_primary)(self.user)
+            self.assertIsNone(await aget_read_replica(self.user))
+
+
+class AsgiApplicationTests(ApiTestCase):
+    """Приложение, которое запускает uvicorn из Dockerfile."""
+
+    async def test_serves_requests(self):
+        from foodgram.asgi import application
+        self.assertIsInstance(application, ASGIHandler)
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'',
+                    'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await application({
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': '/api/tags/', 'raw_path': b'/api/tags/',
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 1), 'server': ('testserver', 80),
+        }, receive, send)
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(b'breakfast', b''.join(
+            message.get('body', b'') for message in messages[1:]))
@@ -0,0 +1,53 @@
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from api.tests.base import ApiTestCase, create_user
+
+ME_URL = '/api/users/me/'
+
+
+class CachedTokenAuthenticationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(1)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def delete_token_in_other_process(self):
+        # Сигналы и сброс версии в этом процессе не выполняются.
+        Token.objects.filter(pk=self.token.pk)._raw_delete('default')
+
+    def test_local_cache_checks_token_in_database(self):
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+        self.delete_token_in_other_process()
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_skips_database(self):
+        self.client.get(ME_URL)
+        # Остаётся только проверка подписки на себя, без токена и юзера.
+        with self.assertNumQueries(1):
+            response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_token_delete(self):
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_user_deactivation(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
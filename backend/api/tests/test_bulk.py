@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.db import transaction
+from rest_framework import status
+
+from api.tests.base import (ApiTestCase, create_recipe, create_user,
+                            get_client)
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+FAVORITE_BULK_URL = '/api/recipes/favorite/bulk/'
+SHOPPING_CART_BULK_URL = '/api/recipes/shopping_cart/bulk/'
+
+
+class BulkRecipeUserTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = create_user(1)
+        cls.user = create_user(2)
+        cls.recipes = [create_recipe(cls.author, f'Рецепт {number}')
+                       for number in range(6)]
+
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.user)
+
+    def post(self, url, recipes):
+        response = self.client.post(
+            url, {'recipes': [recipe.pk for recipe in recipes]},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def delete(self, url, recipe_ids):
+        response = self.client.delete(
+            url, {'recipes': recipe_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def counters(self, field):
+        return list(Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in self.recipes]
+        ).order_by('pk').values_list(field, flat=True))
+
+    def test_bulk_create_results(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        missing = max(recipe.pk for recipe in self.recipes) + 1
+        response = self.client.post(FAVORITE_BULK_URL, {'recipes': [
+            self.recipes[0].pk, self.recipes[1].pk, missing,
+            self.recipes[2].pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([item['status'] for item in results],
+                         ['error', 'created', 'error', 'created'])
+        self.assertEqual(results[1]['recipe']['name'], 'Рецепт 1')
+        self.assertEqual(self.counters('favorites_count'),
+                         [1, 1, 1, 0, 0, 0])
+
+    def test_bulk_create_counts_only_inserted_rows(self):
+        atomic = transaction.atomic
+        concurrent = []
+
+        def atomic_after_other_request(*args, **kwargs):
+            if not concurrent:
+                # Между проверкой и вставкой тот же рецепт добавил
+                # параллельный запрос.
+                concurrent.append(ShoppingCart.objects.create(
+                    user=self.user, recipe=self.recipes[0]))
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(transaction, 'atomic',
+                               atomic_after_other_request):
+            results = self.post(SHOPPING_CART_BULK_URL, self.recipes[:3])
+        self.assertEqual([item['status'] for item in results],
+                         ['error', 'created', 'created'])
+        self.assertEqual(self.counters('in_carts_count'),
+                         [1, 1, 1, 0, 0, 0])
+        self.assertEqual(ShoppingCart.objects.filter(user=self.user).count(),
+                         3)
+
+    def test_bulk_delete(self):
+        self.post(FAVORITE_BULK_URL, self.recipes[:5])
+        missing = max(recipe.pk for recipe in self.recipes) + 1
+        with self.assertNumQueries(6):
+            results = self.delete(
+                FAVORITE_BULK_URL,
+                [recipe.pk for recipe in self.recipes[:4]] + [missing])
+        self.assertEqual([item['status'] for item in results],
+                         ['deleted'] * 4 + ['error'])
+        self.assertEqual(self.counters('favorites_count'),
+                         [0, 0, 0, 0, 1, 0])
+
+    def test_bulk_delete_query_count_is_constant(self):
+        self.post(SHOPPING_CART_BULK_URL, self.recipes)
+        with self.assertNumQueries(6):
+            self.delete(SHOPPING_CART_BULK_URL, [self.recipes[0].pk])
+        with self.assertNumQueries(6):
+            self.delete(SHOPPING_CART_BULK_URL,
+                        [recipe.pk for recipe in self.recipes[1:]])
+        self.assertEqual(self.counters('in_carts_count'), [0] * 6)
+
+    def test_bulk_delete_bumps_cart_once(self):
+        self.post(SHOPPING_CART_BULK_URL, self.recipes)
+        with mock.patch('api.views.bump_cart_versions') as view_bump, \
+                mock.patch('api.signals.bump_cart_versions') as signal_bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.delete(SHOPPING_CART_BULK_URL,
+                            [recipe.pk for recipe in self.recipes])
+        view_bump.assert_called_once_with([self.user.pk])
+        signal_bump.assert_not_called()
+        self.assertFalse(ShoppingCart.objects.filter(user=self.user).exists())
+
+    def test_single_delete_still_changes_counters(self):
+        self.post(FAVORITE_BULK_URL, self.recipes[:1])
+        Favorite.objects.get(user=self.user, recipe=self.recipes[0]).delete()
+        self.assertEqual(self.counters('favorites_count'), [0] * 6)
@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from rest_framework import status
+
+from api.catalog import (CATALOG_VERSION_KEY, get_catalog_version,
+                         load_catalog_version)
+from api.tests.base import ApiTestCase
+from recipes.models import Ingredient, Tag
+
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+class CatalogVersionTests(ApiTestCase):
+
+    def expire_version(self):
+        # То же, что истечение CATALOG_VERSION_TIMEOUT в другом процессе.
+        cache.delete(CATALOG_VERSION_KEY)
+
+    def test_bulk_create_changes_version(self):
+        version = get_catalog_version()
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='Новый', measurement_unit='г')])
+        self.assertEqual(get_catalog_version(), version)
+        self.expire_version()
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_raw_delete_changes_version(self):
+        version = load_catalog_version()
+        Tag.objects.filter(pk=self.tags[0].pk)._raw_delete('default')
+        self.assertNotEqual(load_catalog_version(), version)
+
+    def test_save_bumps_version(self):
+        version = get_catalog_version()
+        ingredient = self.ingredients[0]
+        ingredient.name = 'Переименован'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_list_follows_database(self):
+        response = self.client.get(INGREDIENTS_URL)
+        etag = response['ETag']
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='Новый', measurement_unit='г')])
+        self.expire_version()
+        response = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Новый', {item['name'] for item in response.json()})
+        response = self.client.get(
+            INGREDIENTS_URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class IngredientIndexTests(ApiTestCase):
+
+    def search(self, name):
+        response = self.client.get(INGREDIENTS_URL, {'name': name})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.json()]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('ингредиент 0'),
+                         [f'Ингредиент 0{number}' for number in range(10)])
+        self.assertEqual(self.search('Ингредиент 05'), ['Ингредиент 05'])
+
+    def test_index_follows_other_process(self):
+        self.assertEqual(self.search('Мука'), [])
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='Мука', measurement_unit='г')])
+        cache.delete(CATALOG_VERSION_KEY)
+        self.assertEqual(self.search('мук'), ['Мука'])
+        Ingredient.objects.filter(name='Мука')._raw_delete('default')
+        cache.delete(CATALOG_VERSION_KEY)
+        self.assertEqual(self.search('мук'), [])
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from rest_framework import status
+
+from api.serializers import RecipeCreateSerializer
+from api.tests.base import (ApiTestCase, create_recipe, create_user,
+                            get_client, make_image)
+from recipes.counters import change_counter
+from recipes.models import Recipe
+from users.models import User
+
+
+class UpdateOnlyFieldsTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.recipe = create_recipe(
+            self.author, 'Суп', tags=self.tags[:1],
+            ingredients=[(self.ingredients[0], 100)])
+
+    def test_patch_keeps_concurrent_counter(self):
+        validate = RecipeCreateSerializer.validate
+
+        def validate_during_favorite(serializer, data):
+            # Другой запрос добавляет рецепт в избранное, пока PATCH
+            # держит в памяти загруженный до этого рецепт.
+            change_counter(Recipe, self.recipe.pk, 'favorites_count', 1)
+            return validate(serializer, data)
+
+        with mock.patch.object(RecipeCreateSerializer, 'validate',
+                               validate_during_favorite):
+            response = get_client(self.author).patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {'name': 'Борщ', 'text': 'Новое описание',
+                 'cooking_time': 20, 'tags': [self.tags[1].pk],
+                 'ingredients': [{'id': self.ingredients[1].pk,
+                                  'amount': 50}]},
+                format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Борщ')
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_avatar_keeps_concurrent_counter(self):
+        client = get_client(self.author)
+        change_counter(User, self.author.pk, 'subscribers_count', 1)
+        response = client.put('/api/users/me/avatar/',
+                              {'avatar': make_image()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
+        self.assertEqual(self.author.recipes_count, 1)
+
+    def test_save_skips_update_only_fields(self):
+        change_counter(Recipe, self.recipe.pk, 'in_carts_count', 2)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_variants={'source': 'recipes/images/a.png'})
+        self.recipe.text = 'Другое описание'
+        with self.assertNumQueries(1):
+            self.recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.text, 'Другое описание')
+        self.assertEqual(self.recipe.in_carts_count, 2)
+        self.assertEqual(self.recipe.image_variants,
+                         {'source': 'recipes/images/a.png'})
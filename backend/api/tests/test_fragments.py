@@ -0,0 +1,90 @@
+from unittest import mock
+
+from api.images import build_variants
+from api.tests.base import ApiTestCase, create_recipe, create_user, get_client
+from api.tests.test_images import image_file
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+RECIPES_URL = '/api/recipes/'
+
+
+class FragmentInvalidationTests(ApiTestCase):
+    """Фрагменты карточек пересобираются после изменений, которые в них
+    видны, и берутся из кэша в остальное время.
+
+    Ответы авторизованным не кэшируются целиком, поэтому тесты читают
+    рецепты от имени читателя и видят именно фрагменты.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.recipe = create_recipe(
+            self.author, 'Суп', tags=self.tags[:1],
+            ingredients=[(self.ingredients[0], 100)])
+        self.client = get_client(create_user(2))
+
+    def get_card(self):
+        response = self.client.get(RECIPES_URL)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def test_cached_until_changed(self):
+        self.get_card()
+        Recipe.objects.filter(pk=self.recipe.pk).update(name='Без сигнала')
+        self.assertEqual(self.get_card()['name'], 'Суп')
+        self.change(lambda: Recipe.objects.get(pk=self.recipe.pk).save())
+        self.assertEqual(self.get_card()['name'], 'Без сигнала')
+
+    def test_ingredient_rename(self):
+        self.get_card()
+
+        def rename():
+            ingredient = Ingredient.objects.get(pk=self.ingredients[0].pk)
+            ingredient.name = 'Вода'
+            ingredient.save()
+        self.change(rename)
+        self.assertEqual(self.get_card()['ingredients'][0]['name'], 'Вода')
+
+    def test_tag_rename(self):
+        self.get_card()
+
+        def rename():
+            tag = Tag.objects.get(pk=self.tags[0].pk)
+            tag.slug = 'brunch'
+            tag.save()
+        self.change(rename)
+        self.assertEqual(self.get_card()['tags'][0]['slug'], 'brunch')
+
+    def test_author_name(self):
+        self.get_card()
+
+        def rename():
+            author = User.objects.get(pk=self.author.pk)
+            author.username = 'chef'
+            author.save()
+        self.change(rename)
+        self.assertEqual(self.get_card()['author']['username'], 'chef')
+
+    def test_author_avatar(self):
+        self.assertIsNone(self.get_card()['author']['avatar'])
+
+        def set_avatar():
+            author = User.objects.get(pk=self.author.pk)
+            author.avatar = image_file('avatar.png')
+            author.save()
+        # Копии строятся ниже в этом же потоке, а не в пуле.
+        with mock.patch('api.images.submit_variants'):
+            self.change(set_avatar)
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(self.get_card()['author']['avatar'],
+                         f'http://testserver{author.avatar.url}')
+        # Уменьшенная копия сохраняется через update() без сигналов.
+        self.assertTrue(build_variants(User, author.pk, 'avatar'))
+        author.refresh_from_db()
+        self.assertIn('variants/', self.get_card()['author']['avatar'])
@@ -0,0 +1,141 @@
+import base64
+import io
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.images import (get_image_url, image_executor, schedule_variants,
+                        submit_variants)
+from api.tests.base import (ApiTestCase, create_recipe, create_user,
+                            get_client, make_image)
+from foodgram import constants
+from recipes.models import Recipe
+
+
+def image_file(name='dish.png'):
+    return ContentFile(base64.b64decode(make_image().split(',')[1]), name)
+
+
+class ImageVariantsTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+
+    def create_recipe_with_image(self, content):
+        # Задача в пуле не запускается: on_commit в тестах не срабатывает.
+        return create_recipe(self.author, 'Суп', image=content)
+
+    def run_command(self):
+        output = io.StringIO()
+        call_command('build_image_variants', stdout=output)
+        return output.getvalue()
+
+    def test_command_builds_missing_variants(self):
+        recipe = self.create_recipe_with_image(image_file())
+        self.assertEqual(recipe.image_variants, {})
+        output = self.run_command()
+        self.assertIn('recipes.Recipe.image: создано 1 из 1', output)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        for variant in constants.IMAGE_VARIANTS:
+            for path in recipe.image_variants[variant].values():
+                self.assertTrue(recipe.image.storage.exists(path))
+        self.assertIn('создано 0 из 0', self.run_command())
+
+    def test_command_logs_broken_image(self):
+        recipe = self.create_recipe_with_image(
+            ContentFile(b'not an image', 'broken.png'))
+        with self.assertLogs('api.images', 'ERROR') as logs:
+            output = self.run_command()
+        self.assertIn('recipes.Recipe.image: создано 0 из 1', output)
+        self.assertIn(f'Recipe {recipe.pk}.image', logs.output[0])
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).image_variants, {})
+
+    def test_schedule_after_shutdown_is_logged(self):
+        recipe = self.create_recipe_with_image(image_file())
+        with mock.patch.object(image_executor, 'submit',
+                               side_effect=RuntimeError('shutdown')):
+            with self.assertLogs('api.images', 'ERROR') as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    schedule_variants(recipe, 'image')
+        self.assertIn('build_image_variants', logs.output[0])
+
+    def test_failed_task_is_logged(self):
+        recipe = self.create_recipe_with_image(image_file())
+        futures = []
+        submit = image_executor.submit
+
+        def capture(*args):
+            futures.append(submit(*args))
+            return futures[-1]
+
+        with mock.patch.object(image_executor, 'submit', capture), \
+                mock.patch('api.images.build_variants',
+                           side_effect=OSError('диск заполнен')):
+            with self.assertLogs('api.images', 'ERROR') as logs:
+                submit_variants(Recipe, recipe.pk, 'image')
+                futures[0].exception()
+        self.assertIn('диск заполнен', logs.output[0])
+
+    def test_request_does_not_resize(self):
+        with mock.patch('api.images.build_variants') as build, \
+                mock.patch('api.images.submit_variants') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = get_client(self.author).post('/api/recipes/', {
+                    'ingredients': [{'id': self.ingredients[0].pk,
+                                     'amount': 1}],
+                    'tags': [self.tags[0].pk],
+                    'image': make_image(),
+                    'name': 'Суп',
+                    'text': 'Описание',
+                    'cooking_time': 5,
+                }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        build.assert_not_called()
+        submit.assert_called_once_with(Recipe, response.data['id'], 'image')
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(recipe.image_variants, {})
+        self.assertEqual(response.data['image'],
+                         f'http://testserver{recipe.image.url}')
+
+
+@override_settings(IMAGE_VARIANT_FORMAT='webp')
+class ImageUrlTests(ApiTestCase):
+    """Пока уменьшенной копии нет, ссылка ведёт на оригинал."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = Recipe._meta.get_field('image').storage
+        self.name = 'recipes/images/dish.png'
+
+    def get_url(self, variants, variant='card'):
+        return get_image_url(self.storage, self.name, variants, variant,
+                             None)
+
+    def test_variant(self):
+        variants = {'source': self.name,
+                    'card': {'webp': 'recipes/images/variants/d.webp'}}
+        self.assertEqual(self.get_url(variants),
+                         self.storage.url('recipes/images/variants/d.webp'))
+
+    def test_fallback_to_original(self):
+        original = self.storage.url(self.name)
+        cases = {
+            'нет копий': {},
+            'копии старого файла': {
+                'source': 'recipes/images/old.png',
+                'card': {'webp': 'recipes/images/variants/old.webp'}},
+            'нет размера': {'source': self.name, 'full': {
+                'webp': 'recipes/images/variants/d.webp'}},
+            'нет формата': {'source': self.name, 'card': {
+                'jpg': 'recipes/images/variants/d.jpg'}},
+        }
+        for case, variants in cases.items():
+            with self.subTest(case):
+                self.assertEqual(self.get_url(variants), original)
+
+    def test_empty_image(self):
+        self.assertIsNone(get_image_url(self.storage, '', {}, 'card', None))
@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+
+from api.tests.base import ApiTestCase, create_recipe, create_user
+from recipes.models import ImportCheckpoint, Recipe
+from users.models import User
+
+IMPORT = 'recipes.management.commands.import_recipes'
+
+
+def describe(recipe):
+    return (recipe.author.email, recipe.name, recipe.cooking_time,
+            frozenset(recipe.tags.values_list('slug', flat=True)),
+            frozenset(recipe.recipe_ingredients.values_list(
+                'ingredient__name', 'amount')))
+
+
+class ImportExportTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recipes.jsonl')
+
+    def write(self, lines):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.writelines(f'{line}\n' for line in lines)
+
+    def recipe_line(self, number):
+        return json.dumps({
+            'author': self.author.email,
+            'name': f'Рецепт {number}',
+            'text': 'Описание',
+            'cooking_time': number + 1,
+            'tags': [self.tags[number % 3].slug],
+            'ingredients': [{'name': self.ingredients[number].name,
+                             'measurement_unit': 'г', 'amount': 10}],
+        }, ensure_ascii=False)
+
+    def run_import(self, *args):
+        stderr = io.StringIO()
+        call_command('import_recipes', self.path, *args,
+                     stdout=io.StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_export_import_round_trip(self):
+        for number in range(3):
+            create_recipe(
+                self.author, f'Рецепт {number}', tags=self.tags[number:],
+                ingredients=[(self.ingredients[number], number + 1),
+                             (self.ingredients[9], 5)],
+                cooking_time=number + 10)
+        expected = sorted(map(describe, Recipe.objects.all()), key=str)
+        call_command('export_recipes', output=self.path, batch_size=2,
+                     stderr=io.StringIO())
+        Recipe.objects.all().delete()
+        self.run_import('--batch-size', '2')
+        self.assertEqual(
+            sorted(map(describe, Recipe.objects.all()), key=str), expected)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).recipes_count, 3)
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.short_url, recipe.generate_short_url())
+
+    def test_invalid_lines_are_skipped(self):
+        bad_time = json.loads(self.recipe_line(1))
+        bad_time['cooking_time'] = 0
+        unknown_author = json.loads(self.recipe_line(2))
+        unknown_author['author'] = 'nobody@example.com'
+        self.write([self.recipe_line(0), '{broken', json.dumps(bad_time),
+                    json.dumps(unknown_author)])
+        stderr = self.run_import()
+        self.assertEqual(
+            list(Recipe.objects.values_list('name', flat=True)),
+            ['Рецепт 0'])
+        for line_number in (2, 3, 4):
+            self.assertIn(f'Строка {line_number} пропущена', stderr)
+
+    def test_resume_after_failed_batch(self):
+        self.write(self.recipe_line(number) for number in range(5))
+        with mock.patch(f'{IMPORT}.fan_out_recipes',
+                        side_effect=[None, DatabaseError('crash')]), \
+                self.assertRaises(DatabaseError):
+            self.run_import('--batch-size', '2', '--checkpoint', 'test')
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name='test').line, 2)
+        self.run_import('--batch-size', '2', '--checkpoint', 'test')
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('name', flat=True)),
+            [f'Рецепт {number}' for number in range(5)])
+        self.assertEqual(ImportCheckpoint.objects.get(name='test').line, 5)
+        self.run_import('--checkpoint', 'test')
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_checkpoint_is_written_with_batch(self):
+        self.write(self.recipe_line(number) for number in range(2))
+        with mock.patch.object(ImportCheckpoint.objects, 'update_or_create',
+                               side_effect=DatabaseError('crash')), \
+                self.assertRaises(DatabaseError):
+            self.run_import('--checkpoint', 'test')
+        # Пакет откатывается вместе с контрольной точкой.
+        self.assertFalse(Recipe.objects.exists())
+        self.run_import('--checkpoint', 'test')
+        self.assertEqual(Recipe.objects.count(), 2)
@@ -0,0 +1,152 @@
+import json
+import re
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.core.handlers.asgi import ASGIHandler
+from django.db.backends.utils import CursorWrapper
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.tests.base import ApiTestCase, create_recipe, create_user
+from foodgram import constants
+from foodgram.instrumentation import (InstrumentationMiddleware,
+                                      RequestMetrics, ViewStats,
+                                      request_metrics, view_stats)
+from foodgram.renderers import FastJSONRenderer
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) SQL", app;dur=[\d.]+, '
+    r'render;dur=([\d.]+), total;dur=[\d.]+')
+
+
+def get_timing(response):
+    match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+    return int(match[1]), float(match[2])
+
+
+@override_settings(INSTRUMENTATION=True, SLOW_REQUEST_THRESHOLD=10 ** 6)
+class InstrumentationMiddlewareTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = create_user(1)
+        cls.token = Token.objects.create(user=cls.user)
+        for number in range(3):
+            create_recipe(cls.user, f'Рецепт {number}', tags=cls.tags[:1],
+                          ingredients=[(cls.ingredients[0], 10)])
+
+    def setUp(self):
+        super().setUp()
+        view_stats.views.clear()
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    def test_sync_view_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get('/api/users/me/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_timing(response)[0], len(queries))
+        self.assertIsNone(request_metrics.get())
+
+    async def test_async_view_queries(self):
+        # ORM асинхронных view работает в другом потоке и соединении,
+        # поэтому SQL считается на уровне курсора любых соединений.
+        queries = []
+        execute = CursorWrapper._execute_with_wrappers
+
+        def count(cursor, sql, *args, **kwargs):
+            queries.append(sql)
+            return execute(cursor, sql, *args, **kwargs)
+
+        with mock.patch.object(CursorWrapper, '_execute_with_wrappers',
+                               count):
+            response = await AsyncClient().get('/api/recipes/', headers={
+                'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 200)
+        sql = get_timing(response)[0]
+        self.assertGreater(sql, 0)
+        self.assertEqual(sql, len(queries))
+        self.assertEqual(view_stats.snapshot()['api:recipes-list'][
+            'min_queries'], sql)
+
+    def test_async_chain_is_not_adapted_to_sync(self):
+        handler = ASGIHandler()
+        handler.load_middleware(is_async=True)
+        # Снаружи цепочку оборачивает convert_exception_to_response.
+        chain = handler._middleware_chain.__wrapped__
+        self.assertIsInstance(chain, InstrumentationMiddleware)
+        self.assertTrue(iscoroutinefunction(chain))
+        self.assertTrue(iscoroutinefunction(chain.process_view))
+
+    def test_disabled(self):
+        with override_settings(INSTRUMENTATION=False):
+            response = Client().get('/api/tags/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_slow_request_is_logged(self):
+        with override_settings(SLOW_REQUEST_THRESHOLD=0), \
+                self.assertLogs('foodgram.instrumentation', 'WARNING') as logs:
+            response = Client().get('/api/users/me/', **self.headers)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_request')
+        self.assertEqual(record['view_name'], 'api:users-me')
+        self.assertEqual(record['queries'], get_timing(response)[0])
+
+    def test_query_growth_is_logged(self):
+        view_stats.add('api:users-me', RequestMetrics(), {
+            'db': 0.0, 'total': 0.0})
+        metrics = RequestMetrics()
+        metrics.queries = constants.QUERY_GROWTH_THRESHOLD
+        middleware = InstrumentationMiddleware(lambda request: None)
+        with self.assertLogs('foodgram.instrumentation', 'WARNING') as logs:
+            middleware.report(
+                Client().get('/api/users/me/', **self.headers).wsgi_request,
+                Client().get('/api/tags/'), 'api:users-me', metrics,
+                metrics.timings())
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['event'], 'query_growth')
+        self.assertEqual(record['view_min_queries'], 0)
+
+
+class ViewStatsTests(ApiTestCase):
+
+    def add(self, stats, queries, db, total):
+        metrics = RequestMetrics()
+        metrics.queries = queries
+        return stats.add('view', metrics, {'db': db, 'total': total})
+
+    def test_snapshot(self):
+        stats = ViewStats()
+        self.add(stats, 4, 2.0, 10.0)
+        self.add(stats, 2, 1.0, 6.0)
+        self.assertEqual(self.add(stats, 6, 3.0, 14.0)['min_queries'], 2)
+        self.assertEqual(stats.snapshot(), {'view': {
+            'requests': 3,
+            'avg_queries': 4.0,
+            'min_queries': 2,
+            'max_queries': 6,
+            'avg_db': 2.0,
+            'avg_total': 10.0,
+        }})
+
+    def test_render_time(self):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            FastJSONRenderer().render([{'id': number} for number in range(
+                1000)])
+        finally:
+            request_metrics.reset(token)
+        self.assertGreater(metrics.render_time, 0)
+
+    def test_metrics_timings(self):
+        metrics = RequestMetrics()
+        with CaptureQueriesContext(connection):
+            metrics(lambda *args: None, 'SELECT 1', None, False, {})
+        self.assertEqual(metrics.queries, 1)
+        self.assertEqual(metrics.slowest_sql, 'SELECT 1')
+        self.assertEqual(set(metrics.timings()),
+                         {'db', 'app', 'render', 'view', 'total'})
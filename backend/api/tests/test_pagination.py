@@ -0,0 +1,90 @@
+import base64
+import json
+
+from rest_framework import status
+
+from api.tests.base import (ApiTestCase, create_recipe, create_user,
+                            get_client)
+from users.models import Subscription
+
+RECIPES_URL = '/api/recipes/'
+FEED_URL = '/api/recipes/feed/'
+
+
+def encode_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+class RecipeCursorTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = create_user(1)
+        for number in range(7):
+            create_recipe(cls.author, f'Рецепт {number % 3}',
+                          tags=cls.tags[:1])
+
+    def walk(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend((item['name'], item['id'])
+                         for item in response.data['results'])
+            url = response.data['next']
+        return names
+
+    def test_cursor_pages_follow_ordering(self):
+        self.assertEqual(
+            self.walk(f'{RECIPES_URL}?cursor=&limit=2'),
+            sorted((name, pk) for name, pk in self.author.recipes.values_list(
+                'name', 'id')))
+
+    def test_invalid_cursor(self):
+        for cursor in (
+            'не base64',
+            encode_cursor([1, 2]),
+            encode_cursor({'p': ['Рецепт 1'], 'r': 0}),
+            encode_cursor({'p': [{'a': 1}, 'x'], 'r': 0}),
+            encode_cursor({'p': ['Рецепт 1', None], 'r': 0}),
+            encode_cursor({'p': ['Рецепт 1', [1]], 'r': 1}),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(RECIPES_URL, {'cursor': cursor})
+                self.assertEqual(response.status_code,
+                                 status.HTTP_404_NOT_FOUND)
+
+
+class FeedCursorTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = create_user(1)
+        cls.reader = create_user(2)
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        cls.recipe_ids = [
+            create_recipe(cls.author, f'Рецепт {number}').pk
+            for number in range(5)
+        ]
+
+    def test_feed_pages(self):
+        client = get_client(self.reader)
+        url, ids = f'{FEED_URL}?limit=2', []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, self.recipe_ids[::-1])
+
+    def test_invalid_feed_cursor(self):
+        client = get_client(self.reader)
+        for position in (['notadate', 1], [None, 1],
+                         ['2024-01-01T00:00:00+00:00', 'x']):
+            with self.subTest(position=position):
+                response = client.get(FEED_URL, {'cursor': encode_cursor(
+                    {'p': position, 'r': 0})})
+                self.assertEqual(response.status_code,
+                                 status.HTTP_404_NOT_FOUND)
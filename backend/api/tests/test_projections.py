@@ -0,0 +1,167 @@
+import io
+import json
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeGetSerializer, UserSubscribtionGetSerializer
+from api.tests.base import ApiTestCase, create_recipe, create_user, get_client
+from api.tests.test_images import image_file
+from recipes.management.commands.bench_serialization import \
+    Command as BenchSerialization
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+RECIPES_URL = '/api/recipes/'
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+class ProjectionTests(ApiTestCase):
+    """Ответы на api.projections совпадают с сериализаторами DRF поле
+    за полем и соответствуют docs/openapi-schema.yml."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = create_user(1, avatar=image_file('avatar.png'))
+        cls.reader = create_user(2)
+        cls.other = create_user(3)
+        ingredients = cls.ingredients
+        cls.recipes = [
+            create_recipe(cls.author, 'Борщ', tags=cls.tags[:2],
+                          ingredients=((ingredients[0], 100),
+                                       (ingredients[1], 5)),
+                          image=image_file()),
+            create_recipe(cls.author, 'Каша', tags=cls.tags[2:],
+                          ingredients=((ingredients[2], 200),),
+                          image=image_file(), cooking_time=25),
+            create_recipe(cls.other, 'Чай'),
+        ]
+        # Уменьшенные копии есть у аватара и первых двух рецептов,
+        # у последнего рецепта ссылка ведёт на оригинал.
+        call_command('build_image_variants', stdout=io.StringIO())
+        cls.recipes.append(create_recipe(
+            cls.other, 'Омлет', tags=cls.tags[:1],
+            ingredients=((ingredients[3], 2),), image=image_file()))
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+
+    def setUp(self):
+        super().setUp()
+        self.schema = BenchSerialization()
+        self.schema.components = self.schema.load_schema()
+
+    def get_request(self, url, user, **params):
+        request = Request(APIRequestFactory().get(url, params))
+        request.user = user
+        return request
+
+    def assertSameJson(self, response, expected):
+        self.assertEqual(JSONRenderer().render(response),
+                         JSONRenderer().render(expected))
+
+    def assertMatchesSchema(self, items, component):
+        if self.schema.components is None:
+            self.skipTest('Нет PyYAML или docs/openapi-schema.yml')
+        errors = []
+        for index, item in enumerate(items):
+            self.schema.validate(item, {'$ref': component}, f'[{index}]',
+                                 errors)
+        self.assertEqual(errors, [])
+
+    def drf_recipes(self, recipe_ids, request, action='list'):
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        serializer = RecipeGetSerializer(context={
+            'request': request, 'view': SimpleNamespace(action=action)})
+        return [serializers.ModelSerializer.to_representation(
+            serializer, recipes[pk]) for pk in recipe_ids]
+
+    def check_list(self, user):
+        response = get_client(user).get(RECIPES_URL, {'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)['results']
+        self.assertEqual(len(results), len(self.recipes))
+        expected = self.drf_recipes(
+            [item['id'] for item in results],
+            self.get_request(RECIPES_URL, user or AnonymousUser()))
+        self.assertSameJson(results, expected)
+        self.assertMatchesSchema(results, 'RecipeList')
+        return results
+
+    def check_detail(self, user, recipe):
+        url = f'{RECIPES_URL}{recipe.pk}/'
+        response = get_client(user).get(url)
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content)
+        expected = self.drf_recipes(
+            [recipe.pk], self.get_request(url, user or AnonymousUser()),
+            action='retrieve')
+        self.assertSameJson([result], expected)
+        self.assertMatchesSchema([result], 'RecipeList')
+        return result
+
+    def test_list_anonymous(self):
+        results = self.check_list(None)
+        for item in results:
+            self.assertFalse(item['is_favorited'])
+            self.assertFalse(item['is_in_shopping_cart'])
+            self.assertFalse(item['author']['is_subscribed'])
+
+    def test_list_authenticated(self):
+        results = {item['id']: item for item in self.check_list(self.reader)}
+        first, second = self.recipes[:2]
+        self.assertTrue(results[first.pk]['is_favorited'])
+        self.assertTrue(results[second.pk]['is_in_shopping_cart'])
+        self.assertTrue(results[first.pk]['author']['is_subscribed'])
+        self.assertFalse(
+            results[self.recipes[2].pk]['author']['is_subscribed'])
+
+    def test_detail_anonymous(self):
+        for recipe in self.recipes:
+            with self.subTest(recipe=recipe.name):
+                self.check_detail(None, recipe)
+
+    def test_detail_authenticated(self):
+        for recipe in self.recipes:
+            with self.subTest(recipe=recipe.name):
+                self.check_detail(self.reader, recipe)
+
+    def test_detail_and_list_use_own_variants(self):
+        recipe = self.recipes[0]
+        listed = {item['id']: item for item in self.check_list(None)}
+        detail = self.check_detail(None, recipe)
+        self.assertNotEqual(listed[recipe.pk]['image'], detail['image'])
+        self.assertEqual(
+            self.check_detail(None, self.recipes[3])['image'],
+            f'http://testserver{self.recipes[3].image.url}')
+
+    def test_subscriptions(self):
+        Subscription.objects.create(user=self.reader, author=self.other)
+        for limit in (1, 5):
+            with self.subTest(recipes_limit=limit):
+                response = get_client(self.reader).get(
+                    SUBSCRIPTIONS_URL, {'recipes_limit': limit})
+                self.assertEqual(response.status_code, 200)
+                results = json.loads(response.content)['results']
+                authors = User.objects.filter(
+                    subscription__user=self.reader
+                ).prefetch_related(Prefetch(
+                    'recipes', queryset=Recipe.objects.all()[:limit],
+                    to_attr='limited_recipes')).order_by('username')
+                expected = UserSubscribtionGetSerializer(
+                    authors, many=True, context={
+                        'request': self.get_request(
+                            SUBSCRIPTIONS_URL, self.reader,
+                            recipes_limit=limit)}).data
+                self.assertSameJson(results, expected)
+                self.assertMatchesSchema(results, 'UserWithRecipes')
+                self.assertEqual(
+                    [len(item['recipes']) for item in results],
+                    [min(limit, 2), min(limit, 2)])
@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.serializers import RecipeCreateSerializer
+from api.tests.base import (ApiTestCase, create_recipe, create_user,
+                            get_client, make_image)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+RECIPES_URL = '/api/recipes/'
+RECIPE_URL = '/api/recipes/{pk}/'
+INGREDIENTS_TABLE = RecipeIngredient._meta.db_table
+TAGS_TABLE = Recipe.tags.through._meta.db_table
+
+
+def get_writes(queries, table):
+    """Команды INSERT, UPDATE и DELETE к table."""
+    return [
+        query['sql'].split(None, 1)[0].upper() for query in queries
+        if table in query['sql'] and not query['sql'].upper().startswith(
+            ('SELECT', 'SAVEPOINT', 'RELEASE'))
+    ]
+
+
+class RecipeUpdateTests(ApiTestCase):
+    """Обновление рецепта пишет только изменившиеся ингредиенты и теги."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.recipe = create_recipe(
+            self.author, 'Суп', tags=self.tags[:2],
+            ingredients=[(ingredient, 10 * (number + 1)) for number, ingredient
+                         in enumerate(self.ingredients[:3])])
+        self.rows = {row.ingredient_id: row.pk
+                     for row in self.recipe.recipe_ingredients.all()}
+
+    def patch(self, ingredients, tags, **fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = get_client(self.author).patch(
+                RECIPE_URL.format(pk=self.recipe.pk), {
+                    'ingredients': [{'id': ingredient.pk, 'amount': amount}
+                                    for ingredient, amount in ingredients],
+                    'tags': [tag.pk for tag in tags],
+                    **fields,
+                }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response, queries
+
+    def get_amounts(self):
+        return dict(self.recipe.recipe_ingredients.values_list(
+            'ingredient_id', 'amount'))
+
+    def test_same_ingredients_write_nothing(self):
+        response, queries = self.patch(
+            [(ingredient, 10 * (number + 1)) for number, ingredient
+             in enumerate(self.ingredients[:3])],
+            self.tags[:2], text='Исправленное описание')
+        self.assertEqual(get_writes(queries, INGREDIENTS_TABLE), [])
+        self.assertEqual(get_writes(queries, TAGS_TABLE), [])
+        self.assertEqual(response.data['text'], 'Исправленное описание')
+        self.assertEqual(
+            {row.ingredient_id: row.pk
+             for row in self.recipe.recipe_ingredients.all()},
+            self.rows)
+
+    def test_only_changed_rows_are_written(self):
+        first, second, third, fourth = self.ingredients[:4]
+        response, queries = self.patch(
+            [(first, 10), (second, 25), (fourth, 40)], self.tags[1:])
+        self.assertEqual(sorted(get_writes(queries, INGREDIENTS_TABLE)),
+                         ['DELETE', 'INSERT', 'UPDATE'])
+        self.assertEqual(sorted(get_writes(queries, TAGS_TABLE)),
+                         ['DELETE', 'INSERT'])
+        self.assertEqual(self.get_amounts(), {
+            first.pk: 10, second.pk: 25, fourth.pk: 40})
+        rows = {row.ingredient_id: row.pk
+                for row in self.recipe.recipe_ingredients.all()}
+        self.assertEqual(rows[first.pk], self.rows[first.pk])
+        self.assertEqual(rows[second.pk], self.rows[second.pk])
+        self.assertNotIn(third.pk, rows)
+        self.assertEqual(
+            [item['id'] for item in response.data['ingredients']],
+            [first.pk, second.pk, fourth.pk])
+        self.assertEqual([tag['id'] for tag in response.data['tags']],
+                         [tag.pk for tag in self.tags[1:]])
+
+    def test_missing_data_skips_tables(self):
+        serializer = RecipeCreateSerializer()
+        with CaptureQueriesContext(connection) as queries:
+            serializer.update(self.recipe, {'name': 'Новый суп'})
+        self.assertEqual(get_writes(queries, INGREDIENTS_TABLE), [])
+        self.assertEqual(get_writes(queries, TAGS_TABLE), [])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новый суп')
+        self.assertEqual(len(self.get_amounts()), 3)
+
+
+class RecipeValidationTests(ApiTestCase):
+    """Id ингредиентов и тегов проверяются одним запросом на модель."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = create_user(1)
+        cls.ingredients += [
+            Ingredient.objects.create(name=f'Ингредиент {number:02d}',
+                                      measurement_unit='г')
+            for number in range(10, 40)
+        ]
+
+    def post(self, ingredients, tags):
+        return get_client(self.author).post(RECIPES_URL, {
+            'ingredients': [{'id': pk, 'amount': 5} for pk in ingredients],
+            'tags': tags,
+            'image': make_image(),
+            'name': 'Салат',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }, format='json')
+
+    def test_queries_do_not_grow_with_ingredients(self):
+        tags = [tag.pk for tag in self.tags]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post([self.ingredients[0].pk], tags[:1])
+        self.assertEqual(response.status_code, 201, response.data)
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.post(
+                [ingredient.pk for ingredient in self.ingredients], tags)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['ingredients']), 40)
+
+    def test_one_lookup_per_model(self):
+        tags = [tag.pk for tag in self.tags]
+        ids = [ingredient.pk for ingredient in self.ingredients]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(ids + [0], tags + [0])
+        self.assertEqual(response.status_code, 400)
+        selects = [query['sql'] for query in queries
+                   if query['sql'].startswith('SELECT')]
+        for model in (Ingredient, Tag):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    len([sql for sql in selects
+                         if f'FROM "{model._meta.db_table}"' in sql]), 1)
+
+    def test_all_errors_are_reported(self):
+        first, second = self.ingredients[:2]
+        missing = Ingredient.objects.order_by('pk').last().pk + 1
+        response = self.post(
+            [first.pk, second.pk, first.pk, missing, missing + 1],
+            [self.tags[0].pk, self.tags[0].pk, 0])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'ingredients': [
+                'Вы пытаетесь добавить в рецепт несколько одинаковых '
+                f'ингредиентов: [{first.pk}]',
+                f'Ингредиенты не найдены: [{missing}, {missing + 1}]',
+            ],
+            'tags': [
+                'Вы пытаетесь добавить в рецепт несколько одинаковых '
+                f'тегов: [{self.tags[0].pk}]',
+                'Теги не найдены: [0]',
+            ],
+        })
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_empty_ids(self):
+        response = self.post([], [])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'ingredients': ['Вы пытаетесь добавить рецепт без ингредиентов'],
+            'tags': ['Вы пытаетесь добавить рецепт без тега'],
+        })
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import ApiTestCase, create_recipe, create_user, get_client
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RECIPES_URL = '/api/recipes/'
+FEED_URL = '/api/recipes/feed/'
+
+
+class RecipeReadQueriesTests(ApiTestCase):
+    """Число запросов на чтение рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = create_user(0)
+        cls.authors = [create_user(number) for number in range(1, 4)]
+        cls.recipes = [
+            create_recipe(
+                cls.authors[number % 3], f'Рецепт {number:02d}',
+                tags=cls.tags[:number % 3 + 1],
+                ingredients=[(ingredient, number + 1) for ingredient
+                             in cls.ingredients[:number % 4 + 1]])
+            for number in range(12)
+        ]
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.reader, author=author)
+            for author in cls.authors[:2])
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.reader, recipe=recipe)
+            for recipe in cls.recipes[::2])
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.reader, recipe=recipe)
+            for recipe in cls.recipes[::3])
+
+    def count_queries(self, client, url, params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def assertConstantQueries(self, user, url, params=None):
+        client = get_client(user)
+        small, small_data = self.count_queries(
+            client, url, {**(params or {}), 'limit': 1})
+        cache.clear()
+        with self.assertNumQueries(small):
+            response = client.get(url, {**(params or {}), 'limit': 12})
+        self.assertEqual(len(small_data['results']), 1)
+        self.assertGreater(len(response.data['results']), 1)
+        return response.data['results']
+
+    def test_list_anonymous(self):
+        results = self.assertConstantQueries(None, RECIPES_URL)
+        self.assertEqual(len(results), 12)
+
+    def test_list_authenticated(self):
+        results = self.assertConstantQueries(self.reader, RECIPES_URL)
+        flags = {item['id']: item for item in results}
+        for number, recipe in enumerate(self.recipes):
+            with self.subTest(recipe=recipe.name):
+                item = flags[recipe.pk]
+                self.assertIs(item['is_favorited'], number % 2 == 0)
+                self.assertIs(item['is_in_shopping_cart'], number % 3 == 0)
+                self.assertIs(item['author']['is_subscribed'],
+                              number % 3 < 2)
+
+    def test_list_filters(self):
+        self.assertConstantQueries(self.reader, RECIPES_URL, {
+            'is_favorited': 1, 'tags': 'breakfast'})
+
+    def test_feed(self):
+        results = self.assertConstantQueries(self.reader, FEED_URL)
+        self.assertEqual(
+            {item['author']['id'] for item in results},
+            {author.pk for author in self.authors[:2]})
+
+    def test_repeated_list_reuses_fragments(self):
+        client = get_client(self.reader)
+        queries, _ = self.count_queries(client, RECIPES_URL, {'limit': 12})
+        with CaptureQueriesContext(connection) as repeated:
+            client.get(RECIPES_URL, {'limit': 12})
+        self.assertLess(len(repeated), queries)
+
+    def test_detail(self):
+        few, many = self.recipes[0], self.recipes[3]
+        for user in (None, self.reader):
+            with self.subTest(user=user):
+                client = get_client(user)
+                queries, data = self.count_queries(
+                    client, f'{RECIPES_URL}{few.pk}/', {})
+                self.assertEqual(len(data['ingredients']), 1)
+                self.assertIs(data['is_favorited'], user is not None)
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get(f'{RECIPES_URL}{many.pk}/')
+                self.assertEqual(len(response.data['ingredients']), 4)
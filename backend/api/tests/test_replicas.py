@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework import status
+
+from api.fragments import get_fragment_keys, load_fragments
+from api.projections import project_recipe_fragments
+from api.tests.base import ApiTestCase, create_recipe, create_user, get_client
+from api.views import RecipeViewSet
+from foodgram.db_router import replica_alias
+from recipes.models import Recipe
+
+# Реплики с таким алиасом нет: любое чтение из неё - ошибка, поэтому
+# тесты проверяют, что записи кэша строятся только по основной базе.
+LAGGING_REPLICA = 'lagging_replica'
+
+
+class PrimaryCacheFillTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = create_user(1)
+        cls.recipe = create_recipe(
+            cls.author, 'Суп', tags=cls.tags[:1],
+            ingredients=[(cls.ingredients[0], 100)])
+
+    def get_from_replica(self, url):
+        with mock.patch('api.replicas.get_read_replica',
+                        return_value=LAGGING_REPLICA):
+            return self.client.get(url)
+
+    def test_anonymous_responses_fill_from_primary(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/',
+                    '/api/tags/', '/api/ingredients/'):
+            with self.subTest(url=url):
+                missed = self.get_from_replica(url)
+                self.assertEqual(missed.status_code, status.HTTP_200_OK)
+                hit = self.get_from_replica(url)
+                self.assertEqual(hit.content, missed.content)
+
+    def test_fragments_fill_from_primary(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        stale.name = 'Старое название с реплики'
+
+        def build(recipes):
+            return project_recipe_fragments(recipes, None, 'card')
+
+        token = replica_alias.set(LAGGING_REPLICA)
+        try:
+            fragments = load_fragments([stale], None, 'card', build)
+        finally:
+            replica_alias.reset(token)
+        self.assertEqual(fragments[stale.pk]['name'], 'Суп')
+        cached = load_fragments([stale], None, 'card', mock.Mock(
+            side_effect=AssertionError('фрагмент не попал в кэш')))
+        self.assertEqual(cached[stale.pk]['name'], 'Суп')
+
+    def test_deleted_recipe_fragment_not_cached(self):
+        recipe = create_recipe(self.author, 'Удалён')
+        Recipe.objects.filter(pk=recipe.pk)._raw_delete('default')
+        build = mock.Mock(return_value={recipe.pk: {'name': 'Удалён'}})
+        token = replica_alias.set(LAGGING_REPLICA)
+        try:
+            load_fragments([recipe], None, 'card', build)
+        finally:
+            replica_alias.reset(token)
+        key = get_fragment_keys([recipe], None, 'card')[recipe.pk]
+        self.assertIsNone(cache.get(key))
+
+
+class ReplicaResetTests(ApiTestCase):
+
+    def test_unhandled_exception_resets_replica(self):
+        client = get_client(create_user(1))
+        with mock.patch('api.replicas.get_read_replica',
+                        return_value=LAGGING_REPLICA), \
+                mock.patch.object(RecipeViewSet, 'feed',
+                                  side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError):
+                client.get('/api/recipes/feed/')
+        self.assertIsNone(replica_alias.get())
@@ -0,0 +1,135 @@
+from api.tests.base import ApiTestCase, create_recipe, create_user, get_client
+from recipes.models import Favorite, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+RECIPES_URL = '/api/recipes/'
+
+
+class AnonymousResponseCacheTests(ApiTestCase):
+    """Ответы анонимам берутся из кэша, пока записи не сбросят их области.
+
+    bulk_create() и QuerySet.update() не отправляют сигналов и кэш не
+    сбрасывают, поэтому ими проверяется, что ответ пришёл из кэша.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.other = create_user(2)
+        breakfast, lunch = self.tags[:2]
+        self.recipe = create_recipe(
+            self.author, 'Суп', tags=[breakfast],
+            ingredients=[(self.ingredients[0], 100)])
+        self.other_recipe = create_recipe(self.other, 'Каша', tags=[lunch])
+        self.anonymous = get_client()
+
+    def get(self, url=RECIPES_URL, **params):
+        response = self.anonymous.get(url, params)
+        return response.status_code, response.data
+
+    def names(self, **params):
+        return sorted(item['name'] for item in self.get(**params)[1][
+            'results'])
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def rename_silently(self, recipe, name):
+        Recipe.objects.filter(pk=recipe.pk).update(name=name)
+
+    def create_silently(self, author, name):
+        Recipe.objects.bulk_create([Recipe(
+            author=author, name=name, text='Описание', cooking_time=5)])
+
+    def test_hit_needs_no_queries(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+    def test_recipe_edit(self):
+        detail_url = f'{RECIPES_URL}{self.recipe.pk}/'
+        self.get(), self.get(detail_url), self.get(tags='breakfast')
+        self.rename_silently(self.recipe, 'Без сигнала')
+        self.assertEqual(self.names(), ['Каша', 'Суп'])
+
+        def edit():
+            self.recipe.refresh_from_db()
+            self.recipe.name = 'Борщ'
+            self.recipe.save()
+        self.change(edit)
+        self.assertEqual(self.names(), ['Борщ', 'Каша'])
+        self.assertEqual(self.names(tags='breakfast'), ['Борщ'])
+        self.assertEqual(self.get(detail_url)[1]['name'], 'Борщ')
+
+    def test_edit_keeps_other_scopes(self):
+        self.assertEqual(self.names(), ['Каша', 'Суп'])
+        self.assertEqual(self.names(author=self.other.pk), ['Каша'])
+        self.create_silently(self.other, 'Омлет')
+        self.change(lambda: self.recipe.save())
+        self.assertEqual(self.names(author=self.other.pk), ['Каша'])
+        self.assertEqual(self.names(), ['Каша', 'Омлет', 'Суп'])
+
+    def test_ingredient_rows(self):
+        url = f'{RECIPES_URL}{self.recipe.pk}/'
+        self.get(url)
+        self.change(lambda: RecipeIngredient.objects.filter(
+            recipe=self.recipe).first().delete())
+        self.assertEqual(self.get(url)[1]['ingredients'], [])
+
+    def test_author_edit(self):
+        self.get()
+
+        def edit():
+            author = User.objects.get(pk=self.author.pk)
+            author.first_name = 'Новое имя'
+            author.save()
+        self.change(edit)
+        authors = {item['name']: item['author']['first_name']
+                   for item in self.get()[1]['results']}
+        self.assertEqual(authors['Суп'], 'Новое имя')
+
+    def test_tag_edit(self):
+        self.get()
+
+        def edit():
+            tag = Tag.objects.get(pk=self.tags[0].pk)
+            tag.name = 'Поздний завтрак'
+            tag.save()
+        self.change(edit)
+        tags = {item['name']: item['tags'] for item in self.get()[1][
+            'results']}
+        self.assertEqual(tags['Суп'][0]['name'], 'Поздний завтрак')
+
+    def test_tag_m2m_changes(self):
+        lunch = self.tags[1]
+        self.assertEqual(self.names(tags='lunch'), ['Каша'])
+        self.change(lambda: self.recipe.tags.add(lunch))
+        self.assertEqual(self.names(tags='lunch'), ['Каша', 'Суп'])
+        self.change(lambda: lunch.recipe_set.remove(self.other_recipe))
+        self.assertEqual(self.names(tags='lunch'), ['Суп'])
+        self.change(lambda: self.recipe.tags.clear())
+        self.assertEqual(self.names(tags='lunch'), [])
+        self.assertEqual(self.names(tags='breakfast'), [])
+
+    def test_delete(self):
+        url = f'{RECIPES_URL}{self.recipe.pk}/'
+        self.get(), self.get(url)
+        self.change(lambda: Recipe.objects.get(pk=self.recipe.pk).delete())
+        self.assertEqual(self.names(), ['Каша'])
+        self.assertEqual(self.get(url)[0], 404)
+
+    def test_authenticated_responses_bypass_cache(self):
+        Favorite.objects.create(user=self.other, recipe=self.recipe)
+        self.get()
+        response = get_client(self.other).get(RECIPES_URL)
+        favorited = {item['name']: item['is_favorited']
+                     for item in response.data['results']}
+        self.assertEqual(favorited, {'Суп': True, 'Каша': False})
+        self.assertFalse(any(
+            item['is_favorited'] for item in self.get()[1]['results']))
+
+    def test_authenticated_responses_are_not_cached(self):
+        get_client(self.other).get(RECIPES_URL)
+        self.create_silently(self.other, 'Омлет')
+        self.assertEqual(self.names(), ['Каша', 'Омлет', 'Суп'])
@@ -0,0 +1,56 @@
+from unittest import skipUnless
+
+from django.db import connection
+from rest_framework import status
+
+from api.tests.base import ApiTestCase, create_recipe, create_user
+from recipes.models import Recipe
+from recipes.search import FTS_TABLE, search_recipes
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeSearchTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = create_user(1)
+        cls.in_text = create_recipe(author, 'Окрошка', text='Холодный борщ',
+                                    tags=cls.tags[:1])
+        cls.in_name = create_recipe(author, 'Борщ', text='Свёкла',
+                                    tags=cls.tags[1:2])
+        cls.other = create_recipe(author, 'Каша', text='Крупа',
+                                  tags=cls.tags[:2])
+
+    def search(self, **params):
+        response = self.client.get(RECIPES_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+
+    def test_name_matches_first(self):
+        self.assertEqual(self.search(search='борщ'),
+                         [self.in_name.pk, self.in_text.pk])
+
+    def test_prefix_and_filters(self):
+        self.assertEqual(self.search(search='бор', tags='breakfast'),
+                         [self.in_text.pk])
+        self.assertEqual(
+            self.search(search='борщ', tags=['breakfast', 'lunch']),
+            [self.in_name.pk, self.in_text.pk])
+        self.assertEqual(self.search(search='!!!'), [])
+
+    def test_search_follows_updates(self):
+        Recipe.objects.filter(pk=self.other.pk).update(name='Борщ зелёный')
+        self.assertEqual(
+            search_recipes(Recipe.objects.all(), 'борщ').count(), 3)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+    def test_sqlite_plan_starts_from_fts(self):
+        sql, params = search_recipes(
+            Recipe.objects.all(), 'борщ').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(plan[0].startswith(f'SCAN {FTS_TABLE} VIRTUAL'))
+        self.assertIn('INTEGER PRIMARY KEY', plan[1])
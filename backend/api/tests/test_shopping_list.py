@@ -0,0 +1,47 @@
+from rest_framework import status
+
+from api.tests.base import (ApiTestCase, create_recipe, create_user,
+                            get_client)
+from recipes.models import ShoppingCart
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = create_user(1)
+        for number, amount in ((0, 100), (1, 50)):
+            ShoppingCart.objects.create(user=cls.user, recipe=create_recipe(
+                cls.user, f'Рецепт {number}',
+                ingredients=[(cls.ingredients[0], amount),
+                             (cls.ingredients[number + 1], 10)]))
+
+    def download(self, file_format):
+        response = get_client(self.user).get(
+            DOWNLOAD_URL, {'file_format': file_format})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_txt(self):
+        _, content = self.download('txt')
+        text = content.decode()
+        self.assertTrue(text.startswith('Список покупок:'))
+        self.assertIn('Ингредиент 00 - 150 г.', text)
+        self.assertIn('Ингредиент 02 - 10 г.', text)
+
+    def test_csv(self):
+        _, content = self.download('csv')
+        lines = content.decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], 'name,measurement_unit,amount')
+        self.assertEqual(lines[1:], ['Ингредиент 00,г,150',
+                                     'Ингредиент 01,г,10',
+                                     'Ингредиент 02,г,10'])
+
+    def test_pdf(self):
+        response, content = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertTrue(content.rstrip().endswith(b'%%EOF'))
@@ -0,0 +1,108 @@
+import string
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.short_url import SHORT_URL_KEY, short_urls
+from api.tests.base import ApiTestCase, create_recipe, create_user
+from foodgram import constants
+from recipes.models import Recipe
+
+SHORT_URL = '/api/s/{short_url}/'
+CHARACTERS = string.digits + string.ascii_letters
+
+
+def decode(short_url):
+    """Обратное преобразование кода в pk."""
+    modulus = len(CHARACTERS) ** constants.LENGTH_URL
+    number = 0
+    for character in short_url:
+        number = number * len(CHARACTERS) + CHARACTERS.index(character)
+    return number * pow(constants.SHORT_URL_MULTIPLIER, -1, modulus) % modulus
+
+
+class ShortUrlTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+
+    def create(self):
+        recipe = create_recipe(self.author, 'Суп')
+        # Локальный кэш процесса переживает тесты, а pk переиспользуются.
+        short_urls.discard(recipe.short_url)
+        return recipe
+
+    def get_updates(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith(
+            f'UPDATE "{Recipe._meta.db_table}"')]
+
+    def test_codes_round_trip(self):
+        pks = [*range(1, 20001), 10 ** 9, 62 ** 7 - 1]
+        codes = [Recipe(pk=pk).generate_short_url() for pk in pks]
+        self.assertEqual(len(set(codes)), len(pks))
+        for pk, code in zip(pks, codes):
+            self.assertEqual(len(code), constants.LENGTH_URL)
+            self.assertTrue(set(code) <= set(CHARACTERS))
+            self.assertEqual(decode(code), pk)
+
+    def test_code_is_set_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            recipe = Recipe.objects.create(
+                author=self.author, name='Суп', text='Описание',
+                cooking_time=10)
+        # INSERT не знает pk, поэтому код дописывается одним UPDATE.
+        self.assertEqual(len(self.get_updates(queries)), 1)
+        self.assertIn('"short_url"', self.get_updates(queries)[0])
+        self.assertEqual(recipe.short_url, recipe.generate_short_url())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.short_url, recipe.generate_short_url())
+        with CaptureQueriesContext(connection) as queries:
+            recipe.name = 'Борщ'
+            recipe.save()
+        self.assertEqual(len(self.get_updates(queries)), 1)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.short_url, recipe.generate_short_url())
+
+    def test_old_codes_are_kept(self):
+        recipe = self.create()
+        Recipe.objects.filter(pk=recipe.pk).update(short_url='abc123')
+        recipe.refresh_from_db()
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.short_url, 'abc123')
+
+    def test_redirect(self):
+        recipe = self.create()
+        url = SHORT_URL.format(short_url=recipe.short_url)
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(response['Location'],
+                             f'http://testserver/recipes/{recipe.pk}/')
+        short_urls.discard(recipe.short_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_unknown_code(self):
+        recipe = self.create()
+        code = Recipe(pk=recipe.pk + 1).generate_short_url()
+        for short_url in (code, 'unknown'):
+            with self.subTest(short_url=short_url):
+                response = self.client.get(
+                    SHORT_URL.format(short_url=short_url))
+                self.assertEqual(response.status_code, 404)
+                self.assertIsNone(cache.get(
+                    SHORT_URL_KEY.format(short_url=short_url)))
+
+    def test_delete_forgets_code(self):
+        recipe = self.create()
+        url = SHORT_URL.format(short_url=recipe.short_url)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertIsNone(short_urls.get(recipe.short_url))
+        self.assertIsNone(cache.get(
+            SHORT_URL_KEY.format(short_url=recipe.short_url)))
+        self.assertEqual(self.client.get(url).status_code, 404)
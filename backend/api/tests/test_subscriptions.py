@@ -0,0 +1,63 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import ApiTestCase, create_recipe, create_user, get_client
+from users.models import Subscription
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = create_user(0)
+        cls.authors = [create_user(number) for number in range(1, 6)]
+        for number, author in enumerate(cls.authors):
+            for index in range(number + 1):
+                create_recipe(author, f'Рецепт {number}-{index}')
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.reader, author=author)
+            for author in cls.authors)
+
+    def get(self, **params):
+        response = get_client(self.reader).get(SUBSCRIPTIONS_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.get(limit=1, recipes_limit=1)), 1)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.get(limit=5, recipes_limit=5)), 5)
+
+    def test_recipes_limit_is_applied_per_author(self):
+        for limit in (0, 2, 10):
+            with self.subTest(recipes_limit=limit):
+                results = self.get(limit=5, recipes_limit=limit)
+                self.assertEqual(
+                    [len(item['recipes']) for item in results],
+                    [min(limit, number + 1) for number in range(5)])
+
+    def test_counts_and_flags(self):
+        results = self.get(limit=5)
+        self.assertEqual(
+            [(item['id'], item['recipes_count'], len(item['recipes']))
+             for item in results],
+            [(author.pk, number + 1, number + 1)
+             for number, author in enumerate(self.authors)])
+        self.assertTrue(all(item['is_subscribed'] for item in results))
+
+    def test_invalid_recipes_limit(self):
+        client = get_client(self.reader)
+        for value in ('-1', 'abc'):
+            with self.subTest(recipes_limit=value):
+                response = client.get(SUBSCRIPTIONS_URL,
+                                      {'recipes_limit': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.data)
+                response = client.post(
+                    f'/api/users/{self.authors[0].pk}/subscribe/'
+                    f'?recipes_limit={value}')
+                self.assertEqual(response.status_code, 400)
@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
 from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
-                       FoodgramUserViewSet)
+                       FoodgramUserViewSet, instrumentation_stats)
 from api.short_url import short_url_redirect
 
 app_name = 'api'
@@ -13,8 +14,30 @@ router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('tags', TagViewSet, basename='tags')
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
 
+# Маршруты чтения обслуживаются асинхронными view, остальные методы
+# и неподходящие запросы они передают view из роутера.
+router_views = {url.name: url.callback for url in router_v1.urls}
+async_urls = [
+    path('recipes/', async_views.recipe_list(
+        router_views['recipes-list']), name='recipes-list'),
+    path('recipes/<int:pk>/', async_views.recipe_detail(
+        router_views['recipes-detail']), name='recipes-detail'),
+    path('tags/', async_views.tag_list(
+        router_views['tags-list']), name='tags-list'),
+    path('tags/<int:pk>/', async_views.tag_detail(
+        router_views['tags-detail']), name='tags-detail'),
+    path('ingredients/', async_views.ingredient_list(
+        router_views['ingredients-list']), name='ingredients-list'),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail(
+        router_views['ingredients-detail']), name='ingredients-detail'),
+    path('s/<str:short_url>/', async_views.short_url_redirect(
+        short_url_redirect), name='short_url_redirect'),
+]
+
 urlpatterns = [
-    path('s/<str:short_url>/', short_url_redirect, name='short_url_redirect'),
+    path('instrumentation/', instrumentation_stats,
+         name='instrumentation_stats'),
+    *async_urls,
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
@@ -1,8 +1,15 @@
-def create_shopping_list(ingredients_queryset):
-    shopping_list = ['Список покупок:\n']
-    for ingredient in ingredients_queryset:
-        name = ingredient['ingredient__name']
-        unit = ingredient['ingredient__measurement_unit']
-        amount = ingredient['ingredient_amount']
-        shopping_list.append(f'\n{name} - {amount} {unit}., ')
-    return shopping_list
+from rest_framework.exceptions import ValidationError
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        recipes_limit = -1
+    if recipes_limit < 0:
+        raise ValidationError(
+            {'recipes_limit': 'Должно быть целым неотрицательным числом'})
+    return recipes_limit
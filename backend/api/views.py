@@ -1,28 +1,53 @@
-from django.http import FileResponse
-from django.db.models import Sum
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.db.models import F, Prefetch
 from django.shortcuts import get_object_or_404
 
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
-from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import (action, api_view,
+                                       permission_classes)
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.validators import UniqueTogetherValidator
 
+from api.catalog import CatalogListMixin, ingredient_index
 from api.filters import IngredientFilter, RecipeFilter
+from api.pagination import FeedPagination
 from api.permissions import IsAuthenticatedAuthorOrReadOnly
+from api.projections import project_subscriptions
+from api.relations import get_relations
+from api.replicas import ReplicaReadMixin
+from api.response_cache import AnonymousCacheMixin
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
                              RecipeCreateSerializer, RecipeGetSerializer,
+                             RecipeIdsSerializer, RecipeSmallSerializer,
                              ShoppingCartSerializer, TagSerialiser,
-                             AvatarSerializer, UserSubscribeSerializer,
-                             UserSubscribtionGetSerializer)
-from api.utils import create_shopping_list
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                             AvatarSerializer, UserSubscribeSerializer)
+from api.shopping_list import (EXPORT_FORMATS, bump_cart_versions,
+                               stream_shopping_list)
+from api.utils import get_recipes_limit
+from foodgram import constants
+from foodgram.instrumentation import view_stats
+from foodgram.renderers import FastJSONRenderer
+from recipes.counters import bulk_change, bulk_change_counters
+from recipes.feed import uses_timeline
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Subscription, User
 
+FAVORITE_MISSING_MESSAGE = 'У вас нет этого рецепта в избранном'
+SHOPPING_CART_MISSING_MESSAGE = 'У вас нет этого рецепта в списке покупок'
+RECIPE_NOT_FOUND_MESSAGE = 'Рецепт не найден'
+FAST_RENDERER_CLASSES = (FastJSONRenderer, BrowsableAPIRenderer)
+
+
+class FoodgramUserViewSet(ReplicaReadMixin, UserViewSet):
+    cursor_ordering = ('username', 'id')
 
-class FoodgramUserViewSet(UserViewSet):
     @action(
         detail=False,
         permission_classes=[IsAuthenticated]
@@ -52,6 +77,7 @@ class FoodgramUserViewSet(UserViewSet):
             methods=['post'],
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, id):
+        get_recipes_limit(request)
         author = get_object_or_404(User, id=id)
         serializer = UserSubscribeSerializer(
             data={'user': request.user.id, 'author': author.id},
@@ -73,42 +99,63 @@ class FoodgramUserViewSet(UserViewSet):
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            renderer_classes=FAST_RENDERER_CLASSES)
     def subscriptions(self, request):
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
         subscriptions = User.objects.filter(
-            subscription__user=request.user)
+            subscription__user=request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        ).order_by('username')
         page = self.paginate_queryset(subscriptions)
-        serializer = UserSubscribtionGetSerializer(
-            page, many=True,
-            context={'request': request})
-        return self.get_paginated_response(serializer.data)
+        get_relations(request).remember(
+            'is_subscribed', [author.pk for author in page], True)
+        return self.get_paginated_response(
+            project_subscriptions(page, request))
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, CatalogListMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
     permission_classes = (AllowAny, )
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(ReplicaReadMixin, CatalogListMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerialiser
+    renderer_classes = FAST_RENDERER_CLASSES
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    renderer_classes = FAST_RENDERER_CLASSES
     permission_classes = (IsAuthenticatedAuthorOrReadOnly, )
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    cursor_ordering = ('name', 'id')
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
@@ -134,6 +181,109 @@ class RecipeViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False,
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        user = request.user
+        queryset = self.get_queryset()
+        if uses_timeline(user):
+            queryset = queryset.filter(timeline_entries__user=user).annotate(
+                feed_date=F('timeline_entries__pub_date'))
+        else:
+            queryset = queryset.filter(
+                author__subscription__user=user
+            ).annotate(feed_date=F('pub_date'))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_bulk_recipe_ids(request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    @staticmethod
+    def insert_recipe_user_instances(model, user, recipe_ids):
+        """Добавляет недостающие связи одним INSERT.
+
+        Возвращает рецепты, уже существовавшие id и добавленные связи.
+        Вставка идёт без ignore_conflicts, чтобы счётчики менялись ровно
+        на вставленные строки; если ту же связь успел добавить
+        параллельный запрос, проверка и вставка повторяются.
+        """
+        for attempt in range(constants.BULK_INSERT_ATTEMPTS):
+            recipes = Recipe.objects.in_bulk(recipe_ids)
+            existing = set(model.objects.filter(
+                user=user, recipe_id__in=recipes
+            ).values_list('recipe_id', flat=True))
+            instances = [model(user=user, recipe=recipes[recipe_id])
+                         for recipe_id in recipe_ids
+                         if recipe_id in recipes
+                         and recipe_id not in existing]
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(instances)
+                    bulk_change_counters(model, instances, 1)
+            except IntegrityError:
+                if attempt == constants.BULK_INSERT_ATTEMPTS - 1:
+                    raise
+                continue
+            return recipes, existing, instances
+
+    def bulk_create_recipe_user_instances(self, request, serializer):
+        recipe_ids = self.get_bulk_recipe_ids(request)
+        model = serializer.Meta.model
+        unique_validator = next(
+            validator for validator in serializer.Meta.validators
+            if isinstance(validator, UniqueTogetherValidator))
+        recipes, existing, instances = self.insert_recipe_user_instances(
+            model, request.user, recipe_ids)
+        if model is ShoppingCart and instances:
+            transaction.on_commit(
+                lambda: bump_cart_versions([request.user.id]))
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in recipes:
+                results.append({'id': recipe_id, 'status': 'error',
+                                'errors': RECIPE_NOT_FOUND_MESSAGE})
+            elif recipe_id in existing:
+                results.append({'id': recipe_id, 'status': 'error',
+                                'errors': unique_validator.message})
+            else:
+                results.append({
+                    'id': recipe_id,
+                    'status': 'created',
+                    'recipe': RecipeSmallSerializer(
+                        recipes[recipe_id],
+                        context={'request': request}).data
+                })
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def bulk_delete_recipe_user_instances(self, request, model,
+                                          error_message):
+        recipe_ids = self.get_bulk_recipe_ids(request)
+        with transaction.atomic(), bulk_change():
+            instances = list(model.objects.filter(
+                user=request.user, recipe_id__in=recipe_ids
+            ).select_for_update().only('recipe_id'))
+            # Строки заблокированы, поэтому удаляются ровно они;
+            # счётчики и версия корзины меняются одним запросом на пачку.
+            deleted, _ = model.objects.filter(
+                pk__in=[instance.pk for instance in instances]).delete()
+            bulk_change_counters(model, instances, -1)
+            if model is ShoppingCart and deleted:
+                transaction.on_commit(
+                    lambda: bump_cart_versions([request.user.id]))
+        existing = {instance.recipe_id for instance in instances}
+        return Response({'results': [
+            {'id': recipe_id, 'status': 'deleted'}
+            if recipe_id in existing else
+            {'id': recipe_id, 'status': 'error', 'errors': error_message}
+            for recipe_id in recipe_ids
+        ]}, status=status.HTTP_200_OK)
+
     def get_object(self):
         queryset = self.filter_queryset(self.get_queryset())
         pk = self.kwargs.get('pk')
@@ -171,7 +321,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_recipe_user_instance(
             request=request,
             model=Favorite,
-            error_message='У вас нет этого рецепта в избранном',
+            error_message=FAVORITE_MISSING_MESSAGE,
             instance=get_object_or_404(Recipe, id=pk))
 
     @action(
@@ -190,20 +340,68 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_recipe_user_instance(
             request=request,
             model=ShoppingCart,
-            error_message='У вас нет этого рецепта в списке покупок',
+            error_message=SHOPPING_CART_MISSING_MESSAGE,
             instance=get_object_or_404(Recipe, id=pk))
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='favorite/bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_favorite(self, request):
+        return self.bulk_create_recipe_user_instances(
+            request=request,
+            serializer=FavoriteSerializer)
+
+    @bulk_favorite.mapping.delete
+    def bulk_delete_favorite(self, request):
+        return self.bulk_delete_recipe_user_instances(
+            request=request,
+            model=Favorite,
+            error_message=FAVORITE_MISSING_MESSAGE)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='shopping_cart/bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_create_recipe_user_instances(
+            request=request,
+            serializer=ShoppingCartSerializer)
+
+    @bulk_shopping_cart.mapping.delete
+    def bulk_delete_shopping_cart(self, request):
+        return self.bulk_delete_recipe_user_instances(
+            request=request,
+            model=ShoppingCart,
+            error_message=SHOPPING_CART_MISSING_MESSAGE)
+
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shoppingcarts__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        return FileResponse(create_shopping_list(ingredients),
-                            as_attachment=True,
-                            filename='shopping_list.txt')
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'errors': 'Доступные форматы: '
+                           f'{", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        chunks, content_type = stream_shopping_list(
+            request.user, file_format,
+            is_async=isinstance(request._request, ASGIRequest))
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{file_format}"')
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def instrumentation_stats(request):
+    return Response(view_stats.snapshot())
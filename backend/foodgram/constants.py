@@ -8,4 +8,31 @@ MAX_VALUE_AMOUNT = 1000
 MIN_VALUE_COOCKING_TIME = 1
 MAX_VALUE_COOCKING_TIME = 300
 PAGE_SIZE = 6
-LENGTH_URL = 6
+LENGTH_URL = 7
+SHORT_URL_MULTIPLIER = 1580030173
+SHORT_URL_LRU_SIZE = 4096
+SHORT_URL_LRU_TIMEOUT = 60
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+SHOPPING_LIST_CHUNK_ROWS = 500
+SHOPPING_LIST_CHUNK_SIZE = 8192
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (640, 640),
+    'full': (1280, 1280),
+}
+IMAGE_VARIANT_QUALITY = 82
+IMAGE_WORKERS = 2
+RECIPE_RESPONSE_CACHE_TIMEOUT = 10 * 60
+RECIPE_FRAGMENT_CACHE_TIMEOUT = 60 * 60
+ESTIMATED_COUNT_THRESHOLD = 100000
+MAX_BULK_RECIPES = 100
+BULK_INSERT_ATTEMPTS = 3
+FEED_TIMELINE_THRESHOLD = 200
+FEED_BATCH_SIZE = 1000
+QUERY_GROWTH_THRESHOLD = 5
+SLOWEST_SQL_LENGTH = 500
+REPLICA_RETRY_TIMEOUT = 30
+AUTH_TOKEN_LRU_SIZE = 4096
+AUTH_TOKEN_LRU_TIMEOUT = 60
+AUTH_TOKEN_CACHE_TIMEOUT = 10 * 60
+CATALOG_VERSION_TIMEOUT = 60
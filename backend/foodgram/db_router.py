@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from foodgram import constants
+
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+class ReplicaHealth:
+    """Реплики, к которым не удалось подключиться, пропускаются
+    в течение REPLICA_RETRY_TIMEOUT секунд."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._down_until = {}
+
+    def mark_down(self, alias):
+        with self._lock:
+            self._down_until[alias] = (
+                time.monotonic() + constants.REPLICA_RETRY_TIMEOUT)
+
+    def is_available(self, alias):
+        with self._lock:
+            down_until = self._down_until.get(alias)
+            if down_until is not None and down_until > time.monotonic():
+                return False
+            self._down_until.pop(alias, None)
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self.mark_down(alias)
+            return False
+        return True
+
+
+replica_health = ReplicaHealth()
+
+
+def choose_replica():
+    """Случайная доступная реплика или None, если читать нужно
+    с основной базы."""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if replica_health.is_available(alias):
+            return alias
+    return None
+
+
+@contextmanager
+def read_from(alias):
+    """Направляет чтение внутри блока в реплику alias (None - основная
+    база). Ошибка базы выключает реплику на время REPLICA_RETRY_TIMEOUT.
+    """
+    token = replica_alias.set(alias)
+    try:
+        yield alias
+    except DatabaseError:
+        if alias is not None:
+            replica_health.mark_down(alias)
+        raise
+    finally:
+        replica_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Запись всегда идёт в default, чтение - в реплику, выбранную для
+    текущего запроса (см. api.replicas.ReplicaReadMixin)."""
+
+    def db_for_read(self, model, **hints):
+        return replica_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
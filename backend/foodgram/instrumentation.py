@@ -0,0 +1,227 @@
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+from foodgram import constants
+
+logger = logging.getLogger(__name__)
+
+# Счётчики текущего запроса. sync_to_async копирует контекст, поэтому
+# их видят и потоки, в которых асинхронные view выполняют ORM.
+request_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: SQL, рендеринг и общее время."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time, self.slowest_sql = elapsed, sql
+
+    def timings(self):
+        """Длительности этапов в миллисекундах.
+
+        view - время от вызова view до ответа без рендеринга, app - его
+        часть без SQL (в основном работа сериализаторов).
+        """
+        finished = time.perf_counter()
+        view = (finished - (self.view_started or finished)
+                - self.render_time)
+        return {
+            'db': self.db_time * 1000,
+            'app': max(view - self.db_time, 0) * 1000,
+            'render': self.render_time * 1000,
+            'view': view * 1000,
+            'total': (finished - self.started) * 1000,
+        }
+
+
+class ViewStats:
+    """Накопленная в памяти процесса статистика по view."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, view_name, metrics, timings):
+        with self.lock:
+            stats = self.views.setdefault(view_name, {
+                'requests': 0,
+                'queries': 0,
+                'min_queries': metrics.queries,
+                'max_queries': 0,
+                'db': 0.0,
+                'total': 0.0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += metrics.queries
+            stats['min_queries'] = min(stats['min_queries'], metrics.queries)
+            stats['max_queries'] = max(stats['max_queries'], metrics.queries)
+            stats['db'] += timings['db']
+            stats['total'] += timings['total']
+            return dict(stats)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view_name: {
+                    'requests': stats['requests'],
+                    'avg_queries': stats['queries'] / stats['requests'],
+                    'min_queries': stats['min_queries'],
+                    'max_queries': stats['max_queries'],
+                    'avg_db': stats['db'] / stats['requests'],
+                    'avg_total': stats['total'] / stats['requests'],
+                }
+                for view_name, stats in self.views.items()
+            }
+
+
+view_stats = ViewStats()
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper соединений: SQL учитывается в RequestMetrics
+    запроса, в контексте которого выполняется."""
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class InstrumentationMiddleware:
+    """Замеряет SQL и время ответа, отдаёт их в заголовке Server-Timing.
+
+    Включается настройкой INSTRUMENTATION. Медленные запросы и
+    запросы с заметно большим, чем обычно для этого view, числом SQL
+    (признак N+1) пишутся в лог одной JSON-строкой.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Синхронный process_view Django вызывал бы через sync_to_async.
+            self.process_view = self.aprocess_view
+        # Соединения потоков sync_to_async создаются позже, счётчик
+        # подключается к ним при открытии.
+        connection_created.connect(install_query_counter,
+                                   dispatch_uid='instrumentation_queries')
+        for connection in connections.all():
+            install_query_counter(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def start(request):
+        metrics = request.instrumentation = RequestMetrics()
+        for connection in connections.all():
+            install_query_counter(connection)
+        return metrics, request_metrics.set(metrics)
+
+    def finish(self, request, response, metrics):
+        timings = metrics.timings()
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings["db"]:.1f};desc="{metrics.queries} SQL"',
+            f'app;dur={timings["app"]:.1f}',
+            f'render;dur={timings["render"]:.1f}',
+            f'total;dur={timings["total"]:.1f}',
+        ])
+        match = request.resolver_match
+        if match is not None:
+            self.report(request, response, match.view_name, metrics, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.instrumentation.view_started = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        request.instrumentation.view_started = time.perf_counter()
+
+    def report(self, request, response, view_name, metrics, timings):
+        stats = view_stats.add(view_name, metrics, timings)
+        slow = timings['total'] >= settings.SLOW_REQUEST_THRESHOLD
+        extra_queries = metrics.queries - stats['min_queries']
+        if not slow and extra_queries < constants.QUERY_GROWTH_THRESHOLD:
+            return
+        logger.warning(json.dumps({
+            'event': 'slow_request' if slow else 'query_growth',
+            'method': request.method,
+            'path': request.path,
+            'view_name': view_name,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'view_min_queries': stats['min_queries'],
+            'view_avg_queries': round(stats['queries'] / stats['requests'],
+                                      1),
+            **{name: round(value, 1) for name, value in timings.items()},
+            'slowest_sql_ms': round(metrics.slowest_time * 1000, 1),
+            'slowest_sql': (metrics.slowest_sql or '')[
+                :constants.SLOWEST_SQL_LENGTH],
+        }, ensure_ascii=False))
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer, который сообщает время рендеринга в RequestMetrics."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        finally:
+            metrics = request_metrics.get()
+            if metrics is not None:
+                metrics.render_time += time.perf_counter() - started
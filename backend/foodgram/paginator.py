@@ -0,0 +1,24 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from foodgram import constants
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для нефильтрованных больших таблиц PostgreSQL берёт число строк
+    из статистики планировщика вместо COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > constants.ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
@@ -0,0 +1,44 @@
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from foodgram.instrumentation import TimedJSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен и включён
+    FAST_JSON_RENDERER.
+
+    Вывод совпадает с JSONRenderer байт в байт для всего, кроме float
+    с экспонентой (1e16 вместо 1e+16), поэтому рендерер подключается
+    только к запросам, в ответах которых float нет. С отступами,
+    нестандартными настройками JSON и для неподдерживаемых orjson
+    значений работает обычный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or not settings.FAST_JSON_RENDERER
+                or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            rendered = orjson.dumps(
+                data, default=JSONEncoder().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript.
+        return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(TimedJSONRenderer, ORJSONRenderer):
+    """ORJSONRenderer с учётом времени рендеринга в RequestMetrics."""
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,6 +82,49 @@ if os.getenv('USE_SQLITE'):
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
+    # Для проверки реплик локально: копии db.sqlite3, открытые только
+    # на чтение.
+    REPLICA_DATABASES = [
+        {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{os.path.join(BASE_DIR, path)}?mode=ro',
+        }
+        for path in os.getenv('SQLITE_REPLICAS', '').split(',') if path
+    ]
+else:
+    REPLICA_DATABASES = [
+        {**DATABASES['default'], 'HOST': host}
+        for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host
+    ]
+
+DATABASE_REPLICAS = []
+for number, replica in enumerate(REPLICA_DATABASES, 1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {**replica, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db_router.PrimaryReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Такие кэши видны только своему процессу: сброс версий в одном
+# воркере не доходит до остальных. Кэш токенов с ними выключается,
+# а check --deploy требует Redis или Memcached.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -128,12 +172,30 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'foodgram.instrumentation.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageLimitPagination',
     'PAGE_SIZE': constants.PAGE_SIZE,
 }
 
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', 'False').lower() == 'true'
+
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 500))
+
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'webp')
+
+FAST_JSON_RENDERER = os.getenv(
+    'FAST_JSON_RENDERER', 'True').lower() == 'true'
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
@@ -0,0 +1,59 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+    (User, 'subscriptions_count', Subscription, 'user'),
+)
+
+bulk_change_active = ContextVar('bulk_change_active', default=False)
+
+
+def actual_count(related_model, related_field):
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def change_counter(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def bulk_change_counters(related_model, instances, delta):
+    for model, field, counted_model, related_field in COUNTERS:
+        if counted_model is not related_model:
+            continue
+        totals = Counter(getattr(instance, f'{related_field}_id')
+                         for instance in instances)
+        pks_by_total = defaultdict(list)
+        for pk, total in totals.items():
+            pks_by_total[total].append(pk)
+        for total, pks in pks_by_total.items():
+            model.objects.filter(pk__in=pks).update(
+                **{field: F(field) + delta * total})
+
+
+@contextmanager
+def bulk_change():
+    """Внутри блока сигналы не меняют счётчики и версии корзин по одной
+    строке: вызывающий код применяет изменения ко всей пачке сам,
+    например через bulk_change_counters."""
+    token = bulk_change_active.set(True)
+    try:
+        yield
+    finally:
+        bulk_change_active.reset(token)
@@ -0,0 +1,72 @@
+from foodgram.constants import FEED_BATCH_SIZE, FEED_TIMELINE_THRESHOLD
+from recipes.models import Recipe, TimelineEntry
+from users.models import Subscription, User
+
+
+def uses_timeline(user):
+    """Лента читается из TimelineEntry у тех, кто подписан на многих."""
+    return get_subscriptions_count(user.pk) >= FEED_TIMELINE_THRESHOLD
+
+
+def fan_out_recipes(recipes):
+    """Раскладывает новые рецепты по лентам подписчиков-«тяжеловесов»."""
+    recipes = {recipe.id: recipe for recipe in recipes}
+    if not recipes:
+        return
+    subscriptions = Subscription.objects.filter(
+        author__recipes__in=list(recipes),
+        user__subscriptions_count__gte=FEED_TIMELINE_THRESHOLD,
+    ).values_list('user_id', 'author__recipes').iterator(
+        chunk_size=FEED_BATCH_SIZE)
+    batch = []
+    for user_id, recipe_id in subscriptions:
+        batch.append(TimelineEntry(
+            user_id=user_id, recipe_id=recipe_id,
+            pub_date=recipes[recipe_id].pub_date))
+        if len(batch) >= FEED_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_timeline(user_id, author_ids):
+    recipes = Recipe.objects.filter(author__in=author_ids).values_list(
+        'id', 'pub_date').iterator(chunk_size=FEED_BATCH_SIZE)
+    batch = []
+    for recipe_id, pub_date in recipes:
+        batch.append(TimelineEntry(
+            user_id=user_id, recipe_id=recipe_id, pub_date=pub_date))
+        if len(batch) >= FEED_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def get_subscriptions_count(user_id):
+    return User.objects.filter(pk=user_id).values_list(
+        'subscriptions_count', flat=True).first() or 0
+
+
+def recipe_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out_recipes([instance])
+
+
+def subscription_added(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    count = get_subscriptions_count(instance.user_id)
+    if count == FEED_TIMELINE_THRESHOLD:
+        backfill_timeline(instance.user_id, Subscription.objects.filter(
+            user=instance.user_id).values('author'))
+    elif count > FEED_TIMELINE_THRESHOLD:
+        backfill_timeline(instance.user_id, [instance.author_id])
+
+
+def subscription_removed(sender, instance, **kwargs):
+    entries = TimelineEntry.objects.filter(user=instance.user_id)
+    if get_subscriptions_count(
+            instance.user_id) < FEED_TIMELINE_THRESHOLD:
+        entries.delete()
+    else:
+        entries.filter(recipe__author=instance.author_id).delete()
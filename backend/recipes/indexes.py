@@ -0,0 +1,25 @@
+from recipes.search import run_statements
+
+# Поиск админки по началу названия (^name) в PostgreSQL компилируется
+# в UPPER(name::text) LIKE UPPER('...%'); обычный btree его не
+# обслуживает, нужен функциональный индекс с text_pattern_ops
+# (upper() возвращает text).
+PREFIX_INDEXES = {
+    'recipes_ingredient_name_upper_idx': 'recipes_ingredient',
+    'recipes_recipe_name_upper_idx': 'recipes_recipe',
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        run_statements(schema_editor, [
+            f'CREATE INDEX {index} ON {table} '
+            f'(UPPER(name) text_pattern_ops)'
+            for index, table in PREFIX_INDEXES.items()
+        ])
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        run_statements(schema_editor, [
+            f'DROP INDEX {index}' for index in PREFIX_INDEXES])
@@ -0,0 +1,80 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes.management.commands.run_benchmark import summarize
+
+DEFAULT_PATHS = (
+    '/api/recipes/?limit=6',
+    '/api/tags/',
+    '/api/ingredients/?name=сол',
+)
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер параллельными GET-запросами и '
+            'печатает JSON с p50/p95/p99 и запросами в секунду. Позволяет '
+            'сравнить синхронный (foodgram.wsgi) и асинхронный '
+            '(foodgram.asgi) запуск на одних и тех же данных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Адрес сервера, например '
+                                        'http://127.0.0.1:8500')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь запроса, можно указать несколько')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--token', help='Токен для заголовка '
+                                            'Authorization')
+        parser.add_argument('--label', help='Подпись запуска в отчёте')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        self.headers = {'Accept': 'application/json'}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+        self.timeout = options['timeout']
+        results = {}
+        for path in options['paths'] or DEFAULT_PATHS:
+            url = options['url'].rstrip('/') + quote(path, safe='/?=&')
+            results[path] = self.load(url, options['concurrency'],
+                                      options['requests'])
+        self.stdout.write(json.dumps({
+            'label': options['label'],
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'paths': results,
+        }, ensure_ascii=False, indent=2))
+
+    def fetch(self, url):
+        started = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=self.headers),
+                         timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        return time.perf_counter() - started, status
+
+    def load(self, url, concurrency, count):
+        try:
+            self.fetch(url)
+        except OSError as error:
+            raise CommandError(f'{url}: {error}')
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(self.fetch, [url] * count))
+        elapsed = time.perf_counter() - started
+        errors = sum(status >= 400 for _, status in results)
+        return {
+            **summarize([latency for latency, _ in results]),
+            'requests_per_second': round(count / elapsed, 1),
+            'errors': errors,
+        }
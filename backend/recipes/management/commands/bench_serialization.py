@@ -0,0 +1,223 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.projections import (add_viewer_flags, project_recipe_fragments,
+                             project_subscriptions)
+from api.relations import get_relations
+from api.serializers import (IngredientSerializer, RecipeGetSerializer,
+                             TagSerialiser, UserSubscribtionGetSerializer)
+from foodgram.renderers import FastJSONRenderer
+from recipes.management.commands.run_benchmark import Command as Benchmark
+from recipes.management.commands.seed_benchmark_data import BENCHMARK_EMAIL
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+SCHEMA_PATH = settings.BASE_DIR.parent / 'docs' / 'openapi-schema.yml'
+SCHEMA_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'boolean': bool,
+}
+SCHEMA_COMPONENTS = {
+    'recipes': 'RecipeList',
+    'subscriptions': 'UserWithRecipes',
+    'tags': 'Tag',
+    'ingredients': 'Ingredient',
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает сериализаторы DRF и api.projections: проверяет, '
+            'что JSON совпадает байт в байт и соответствует '
+            'docs/openapi-schema.yml, и печатает стоимость одной строки '
+            'в микросекундах до и после. Нужны данные из '
+            'seed_benchmark_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100,
+                            help='Рецептов в одной пачке')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help='Файл для результата')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=BENCHMARK_EMAIL.format(number=0))
+        except User.DoesNotExist:
+            raise CommandError(
+                'Нет данных, запустите python manage.py seed_benchmark_data')
+        if 'testserver' not in settings.ALLOWED_HOSTS and (
+                '*' not in settings.ALLOWED_HOSTS):
+            settings.ALLOWED_HOSTS.append('testserver')
+        self.user = user
+        self.request = Request(APIRequestFactory().get('/api/recipes/'))
+        self.request.user = user
+        self.recipe_ids = list(Recipe.objects.order_by('id').values_list(
+            'id', flat=True)[:options['rows']])
+        self.components = self.load_schema()
+        cases = {
+            'recipes': (self.drf_recipes, self.projected_recipes),
+            'subscriptions': (self.drf_subscriptions,
+                              self.projected_subscriptions),
+            'tags': (self.drf_tags, self.projected_tags),
+            'ingredients': (self.drf_ingredients, self.projected_ingredients),
+        }
+        results = {}
+        for name, (drf, projected) in cases.items():
+            rows = self.check_case(name, drf(), projected())
+            results[name] = {
+                'rows': rows,
+                'drf_us_per_row': self.measure(drf, rows, options['repeat']),
+                'projection_us_per_row': self.measure(
+                    projected, rows, options['repeat']),
+            }
+        data = self.projected_recipes()
+        results['render_recipes'] = {
+            'rows': len(data),
+            'json_us_per_row': self.measure(
+                lambda: JSONRenderer().render(data), len(data),
+                options['repeat']),
+            'fast_json_us_per_row': self.measure(
+                lambda: FastJSONRenderer().render(data), len(data),
+                options['repeat']),
+        }
+        report = json.dumps({
+            'commit': Benchmark.get_commit(),
+            'repeat': options['repeat'],
+            'schema_checked': self.components is not None,
+            'cases': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        self.stdout.write(report)
+
+    def load_schema(self):
+        try:
+            import yaml
+        except ImportError:
+            self.stderr.write('PyYAML не установлен, проверка по '
+                              'openapi-schema.yml пропущена')
+            return None
+        if not SCHEMA_PATH.exists():
+            self.stderr.write(f'Нет файла {SCHEMA_PATH}, проверка по '
+                              f'схеме пропущена')
+            return None
+        with open(SCHEMA_PATH, encoding='utf-8') as file:
+            return yaml.safe_load(file)['components']['schemas']
+
+    def check_case(self, name, expected, actual):
+        expected_json = JSONRenderer().render(expected)
+        if JSONRenderer().render(actual) != expected_json:
+            raise CommandError(f'{name}: ответ api.projections отличается '
+                               f'от сериализатора DRF')
+        if FastJSONRenderer().render(actual) != expected_json:
+            raise CommandError(f'{name}: FastJSONRenderer отличается от '
+                               f'JSONRenderer')
+        if self.components is not None:
+            errors = []
+            for index, item in enumerate(actual):
+                self.validate(item, {'$ref': SCHEMA_COMPONENTS[name]},
+                              f'{name}[{index}]', errors)
+            if errors:
+                raise CommandError('\n'.join(errors[:20]))
+        return len(actual)
+
+    def validate(self, value, schema, path, errors):
+        if '$ref' in schema:
+            schema = self.components[schema['$ref'].rsplit('/', 1)[-1]]
+        if value is None:
+            # Ссылки на файлы отдаются как null, если файла нет.
+            if not schema.get('nullable') and schema.get('format') != 'uri':
+                errors.append(f'{path}: null')
+            return
+        expected = SCHEMA_TYPES[schema.get('type', 'object')]
+        if not isinstance(value, expected) or (
+                expected is int and isinstance(value, bool)):
+            errors.append(f'{path}: {type(value).__name__} вместо '
+                          f'{schema.get("type", "object")}')
+            return
+        if expected is list:
+            for index, item in enumerate(value):
+                self.validate(item, schema['items'], f'{path}[{index}]',
+                              errors)
+        elif expected is dict:
+            properties = schema.get('properties', {})
+            for field in schema.get('required', ()):
+                if field not in value:
+                    errors.append(f'{path}: нет поля {field}')
+            for field, item in value.items():
+                if field not in properties:
+                    errors.append(f'{path}: лишнее поле {field}')
+                else:
+                    self.validate(item, properties[field],
+                                  f'{path}.{field}', errors)
+
+    @staticmethod
+    def measure(function, rows, repeat):
+        """Медиана по repeat прогонам, мкс на строку."""
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - started)
+        return round(statistics.median(durations) / max(rows, 1) * 10 ** 6,
+                     2)
+
+    def drf_recipes(self):
+        recipes = Recipe.objects.filter(
+            pk__in=self.recipe_ids
+        ).select_related('author').prefetch_related(
+            'tags', 'recipe_ingredients__ingredient')
+        serializer = RecipeGetSerializer(context={'request': self.request})
+        # Поле за полем, как до api.projections и кэша фрагментов.
+        return [serializers.ModelSerializer.to_representation(
+            serializer, recipe) for recipe in recipes]
+
+    def projected_recipes(self):
+        recipes = list(Recipe.objects.filter(pk__in=self.recipe_ids))
+        fragments = project_recipe_fragments(recipes, self.request, 'card')
+        relations = get_relations(self.request)
+        relations.load_recipes(recipes)
+        return [add_viewer_flags(fragments[recipe.pk], recipe, relations)
+                for recipe in recipes]
+
+    def subscriptions(self):
+        recipes = Recipe.objects.all()[:3]
+        return User.objects.filter(
+            subscription__user=self.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        ).order_by('username')
+
+    def drf_subscriptions(self):
+        return UserSubscribtionGetSerializer(
+            self.subscriptions(), many=True,
+            context={'request': self.request}).data
+
+    def projected_subscriptions(self):
+        return project_subscriptions(list(self.subscriptions()),
+                                     self.request)
+
+    def drf_tags(self):
+        return TagSerialiser(Tag.objects.all(), many=True).data
+
+    def projected_tags(self):
+        return list(Tag.objects.values(*TagSerialiser.Meta.fields))
+
+    def drf_ingredients(self):
+        return IngredientSerializer(Ingredient.objects.all(), many=True).data
+
+    def projected_ingredients(self):
+        return list(Ingredient.objects.values(
+            *IngredientSerializer.Meta.fields))
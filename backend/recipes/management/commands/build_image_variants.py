@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from api.images import build_variants, variants_field
+from recipes.models import Recipe
+from users.models import User
+
+IMAGE_FIELDS = ((Recipe, 'image'), (User, 'avatar'))
+
+
+class Command(BaseCommand):
+    help = ('Создаёт недостающие уменьшенные копии изображений рецептов '
+            'и аватаров: например, если процесс завершился раньше фоновой '
+            'задачи или она упала.')
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_FIELDS:
+            pending = [
+                pk for pk, name, variants in model.objects.values_list(
+                    'pk', field_name, variants_field(field_name)
+                ).iterator()
+                if (name or '') != variants.get('source', '')
+            ]
+            built = sum(build_variants(model, pk, field_name)
+                        for pk in pending)
+            self.stdout.write(f'{model._meta.label}.{field_name}: создано '
+                              f'{built} из {len(pending)}')
@@ -0,0 +1,44 @@
+import json
+import sys
+
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в JSONL в формате команды import_recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='Файл JSONL или - для stdout')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'recipe_ingredients__ingredient'
+        ).order_by('id')
+        file = (sys.stdout if options['output'] == '-'
+                else open(options['output'], 'w', encoding='utf-8'))
+        exported = 0
+        try:
+            for recipe in recipes.iterator(chunk_size=options['batch_size']):
+                file.write(json.dumps({
+                    'author': recipe.author.email,
+                    'name': recipe.name,
+                    'text': recipe.text,
+                    'cooking_time': recipe.cooking_time,
+                    'image': recipe.image.name,
+                    'tags': [tag.slug for tag in recipe.tags.all()],
+                    'ingredients': [
+                        {'name': item.ingredient.name,
+                         'measurement_unit': item.ingredient.measurement_unit,
+                         'amount': item.amount}
+                        for item in recipe.recipe_ingredients.all()
+                    ],
+                }, ensure_ascii=False) + '\n')
+                exported += 1
+        finally:
+            if file is not sys.stdout:
+                file.close()
+        self.stderr.write(f'Выгружено рецептов: {exported}')
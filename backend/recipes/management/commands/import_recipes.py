@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import sys
+import time
+from collections import Counter
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+
+from api.response_cache import ALL_SCOPE, author_scope, bump_scopes, tag_scope
+from foodgram import constants
+from recipes.feed import fan_out_recipes
+from recipes.models import (ImportCheckpoint, Ingredient, Recipe,
+                            RecipeIngredient, Tag)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из JSONL: по одному объекту в строке с '
+            'полями author (email), name, text, cooking_time, image, '
+            'tags (slug) и ingredients (name, measurement_unit, amount).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL или - для stdin')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Название контрольной точки: номер последней загруженной '
+                 'строки хранится в БД, и повторный запуск продолжит '
+                 'загрузку с него')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.checkpoint = options['checkpoint']
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {}
+        for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'):
+            self.ingredients.setdefault((name, unit), pk)
+            self.ingredients.setdefault((name, None), pk)
+        start_line = self.read_checkpoint()
+        self.imported = self.skipped = 0
+        self.started = time.monotonic()
+        file = (sys.stdin if options['path'] == '-'
+                else open(options['path'], encoding='utf-8'))
+        with file:
+            batch = []
+            line_number = 0
+            for line_number, line in enumerate(file, 1):
+                if line_number <= start_line or not line.strip():
+                    continue
+                try:
+                    batch.append((line_number, json.loads(line)))
+                except ValueError as error:
+                    self.skip(line_number, f'неверный JSON: {error}')
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch, line_number)
+                    batch = []
+            if batch:
+                self.import_batch(batch, line_number)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено рецептов: {self.imported}, '
+            f'пропущено строк: {self.skipped}'))
+
+    def read_checkpoint(self):
+        if not self.checkpoint:
+            return 0
+        return ImportCheckpoint.objects.filter(
+            name=self.checkpoint).values_list('line', flat=True).first() or 0
+
+    def write_checkpoint(self, line_number):
+        """Вызывается в транзакции пакета: строки и контрольная точка
+        фиксируются вместе, и пакет не загрузится повторно."""
+        if not self.checkpoint:
+            return
+        ImportCheckpoint.objects.update_or_create(
+            name=self.checkpoint, defaults={'line': line_number})
+
+    def skip(self, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f'Строка {line_number} пропущена: {reason}')
+
+    def parse(self, line_number, data, authors):
+        try:
+            author_id = authors[data['author']]
+        except KeyError:
+            self.skip(line_number, 'неизвестный автор')
+            return None
+        cooking_time = data.get('cooking_time')
+        if not (isinstance(cooking_time, int)
+                and constants.MIN_VALUE_COOCKING_TIME <= cooking_time
+                <= constants.MAX_VALUE_COOCKING_TIME):
+            self.skip(line_number, 'неверное время приготовления')
+            return None
+        try:
+            tag_ids = {self.tags[slug] for slug in data.get('tags', [])}
+        except KeyError as error:
+            self.skip(line_number, f'неизвестный тег {error}')
+            return None
+        ingredients = {}
+        for item in data.get('ingredients', []):
+            ingredient_id = self.ingredients.get(
+                (item.get('name'), item.get('measurement_unit')))
+            amount = item.get('amount')
+            if ingredient_id is None:
+                self.skip(line_number,
+                          f'неизвестный ингредиент {item.get("name")}')
+                return None
+            if not (isinstance(amount, int)
+                    and constants.MIN_VALUE_AMOUNT <= amount
+                    <= constants.MAX_VALUE_AMOUNT):
+                self.skip(line_number, 'неверное количество')
+                return None
+            ingredients[ingredient_id] = amount
+        if not ingredients or not tag_ids or not data.get('name'):
+            self.skip(line_number, 'нет названия, тегов или ингредиентов')
+            return None
+        recipe = Recipe(
+            author_id=author_id,
+            name=data['name'][:constants.MAX_RECIPE_NAME_LINGHT],
+            text=data.get('text', ''),
+            cooking_time=cooking_time,
+            image=data.get('image', ''),
+        )
+        return recipe, tag_ids, ingredients
+
+    def import_batch(self, batch, last_line):
+        authors = dict(User.objects.filter(
+            email__in={data.get('author') for _, data in batch}
+        ).values_list('email', 'id'))
+        parsed = [item for item in (
+            self.parse(line_number, data, authors)
+            for line_number, data in batch) if item]
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                [recipe for recipe, _, _ in parsed])
+            for recipe in recipes:
+                recipe.short_url = recipe.generate_short_url()
+            Recipe.objects.bulk_update(recipes, ['short_url'])
+            recipe_tags = [
+                (recipe.id, tag_id)
+                for recipe, (_, tag_ids, _) in zip(recipes, parsed)
+                for tag_id in tag_ids
+            ]
+            recipe_ingredients = [
+                (recipe.id, ingredient_id, amount)
+                for recipe, (_, _, ingredients) in zip(recipes, parsed)
+                for ingredient_id, amount in ingredients.items()
+            ]
+            if connection.vendor == 'postgresql':
+                self.copy(Recipe.tags.through._meta.db_table,
+                          ('recipe_id', 'tag_id'), recipe_tags)
+                self.copy(RecipeIngredient._meta.db_table,
+                          ('recipe_id', 'ingredient_id', 'amount'),
+                          recipe_ingredients)
+            else:
+                Recipe.tags.through.objects.bulk_create(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                    for recipe_id, tag_id in recipe_tags)
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(recipe_id=recipe_id,
+                                     ingredient_id=ingredient_id,
+                                     amount=amount)
+                    for recipe_id, ingredient_id, amount
+                    in recipe_ingredients)
+            for author_id, total in Counter(
+                    recipe.author_id for recipe in recipes).items():
+                User.objects.filter(pk=author_id).update(
+                    recipes_count=F('recipes_count') + total)
+            fan_out_recipes(recipes)
+            transaction.on_commit(lambda: bump_scopes(
+                {ALL_SCOPE, *map(tag_scope, self.tags),
+                 *(author_scope(recipe.author_id) for recipe in recipes)}))
+            self.write_checkpoint(last_line)
+        self.imported += len(recipes)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'Строка {last_line}: загружено {self.imported} рецептов, '
+            f'{self.imported / elapsed:.0f} рецептов/с')
+
+    @staticmethod
+    def copy(table, columns, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH CSV',
+                buffer)
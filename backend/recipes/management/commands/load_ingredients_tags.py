@@ -3,6 +3,7 @@ import csv
 from django.conf import settings
 from django.core.management import BaseCommand
 
+from api.catalog import bump_catalog_version
 from recipes.models import (Ingredient, Tag)
 
 
@@ -23,3 +24,4 @@ class Command(BaseCommand):
                 Ingredient(**data) for data in csv.DictReader(
                     file,
                     fieldnames=['name', 'measurement_unit']))
+        bump_catalog_version()
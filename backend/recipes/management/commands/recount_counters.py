@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand
+from django.db.models import F
+
+from recipes.counters import COUNTERS, actual_count
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, списков покупок, рецептов '
+            'и подписчиков и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, field, related_model, related_field in COUNTERS:
+            actual = actual_count(related_model, related_field)
+            fixed = 0
+            last_pk = 0
+            while True:
+                pks = list(model.objects.filter(pk__gt=last_pk).order_by(
+                    'pk').values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                drifted = list(model.objects.filter(pk__in=pks).annotate(
+                    actual=actual
+                ).exclude(**{field: F('actual')}).values_list(
+                    'pk', flat=True))
+                if drifted:
+                    fixed += model.objects.filter(pk__in=drifted).update(
+                        **{field: actual})
+            self.stdout.write(
+                f'{model._meta.label}.{field}: исправлено {fixed}')
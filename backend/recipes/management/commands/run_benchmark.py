@@ -0,0 +1,213 @@
+import json
+import random
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.management.commands.seed_benchmark_data import BENCHMARK_EMAIL
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+BENCHMARK_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+def summarize(latencies):
+    """p50/p95/p99 в миллисекундах по списку длительностей в секундах."""
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'p50_ms': round(percentiles[49] * 1000, 2),
+        'p95_ms': round(percentiles[94] * 1000, 2),
+        'p99_ms': round(percentiles[98] * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет основные запросы API внутри процесса и печатает '
+            'JSON с p50/p95/p99, запросами в секунду и числом SQL на '
+            'запрос. Нужны данные из seed_benchmark_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанные сценарии')
+        parser.add_argument('--output', help='Файл для результата')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        try:
+            user = User.objects.get(email=BENCHMARK_EMAIL.format(number=0))
+        except User.DoesNotExist:
+            raise CommandError(
+                'Нет данных, запустите python manage.py seed_benchmark_data')
+        if 'testserver' not in settings.ALLOWED_HOSTS and (
+                '*' not in settings.ALLOWED_HOSTS):
+            settings.ALLOWED_HOSTS.append('testserver')
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        self.tag_ids = list(Tag.objects.values_list('id', flat=True))
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True))
+        self.prefixes = sorted({name[:2] for name in Ingredient.objects.
+                                values_list('name', flat=True)[:500]})
+        self.created = []
+        scenarios = {name: getattr(self, f'scenario_{name}')
+                     for name in self.get_scenario_names()}
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+            scenarios = {name: scenarios[name]
+                         for name in options['scenarios']}
+        try:
+            results = {
+                name: self.measure(scenario, options['iterations'],
+                                   options['warmup'])
+                for name, scenario in scenarios.items()
+            }
+        finally:
+            Recipe.objects.filter(pk__in=self.created).delete()
+        report = json.dumps({
+            'commit': self.get_commit(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'recipes': len(self.recipe_ids),
+            'scenarios': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        self.stdout.write(report)
+
+    @classmethod
+    def get_scenario_names(cls):
+        return [name[len('scenario_'):] for name in dir(cls)
+                if name.startswith('scenario_')]
+
+    def measure(self, scenario, iterations, warmup):
+        for _ in range(warmup):
+            self.check_response(scenario())
+        latencies = []
+        queries = {alias: [] for alias in connections}
+        for _ in range(iterations):
+            # Чтения уходят на реплики, поэтому SQL считается на всех
+            # соединениях.
+            with ExitStack() as stack:
+                contexts = {
+                    alias: stack.enter_context(
+                        CaptureQueriesContext(connections[alias]))
+                    for alias in queries
+                }
+                started = time.perf_counter()
+                self.check_response(scenario())
+                latencies.append(time.perf_counter() - started)
+            for alias, context in contexts.items():
+                queries[alias].append(len(context))
+        return {
+            **summarize(latencies),
+            'requests_per_second': round(len(latencies) / sum(latencies), 1),
+            'queries_per_request': round(
+                sum(map(statistics.mean, queries.values())), 2),
+            'queries_per_alias': {
+                alias: round(statistics.mean(counts), 2)
+                for alias, counts in queries.items()
+            },
+        }
+
+    @staticmethod
+    def check_response(response):
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{response.request["PATH_INFO"]}: {response.status_code} '
+                f'{response.content[:500]!r}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def recipe_data(self):
+        return {
+            'name': f'Бенчмарк {self.random.randint(0, 10 ** 6)}',
+            'text': 'Рецепт для нагрузочного теста',
+            'cooking_time': self.random.randint(5, 180),
+            'image': BENCHMARK_IMAGE,
+            'tags': self.random.sample(self.tag_ids, 1),
+            'ingredients': [
+                {'id': pk, 'amount': self.random.randint(1, 1000)}
+                for pk in self.random.sample(self.ingredient_ids, 5)
+            ],
+        }
+
+    def scenario_recipe_list(self):
+        return self.client.get('/api/recipes/', {
+            'page': self.random.randint(1, 50)})
+
+    def scenario_recipe_list_filtered(self):
+        return self.client.get('/api/recipes/', {
+            'tags': self.random.sample(self.tag_slugs, 2),
+            'is_favorited': self.random.randint(0, 1),
+        })
+
+    def scenario_recipe_list_anonymous(self):
+        return self.anonymous.get('/api/recipes/', {
+            'page': self.random.randint(1, 50),
+            'tags': self.random.choice(self.tag_slugs),
+        })
+
+    def scenario_recipe_detail(self):
+        return self.client.get(
+            f'/api/recipes/{self.random.choice(self.recipe_ids)}/')
+
+    def scenario_subscriptions(self):
+        return self.client.get('/api/users/subscriptions/', {
+            'recipes_limit': 3})
+
+    def scenario_feed(self):
+        return self.client.get('/api/recipes/feed/')
+
+    def scenario_ingredient_search(self):
+        return self.anonymous.get('/api/ingredients/', {
+            'name': self.random.choice(self.prefixes)})
+
+    def scenario_shopping_list(self):
+        return self.client.get('/api/recipes/download_shopping_cart/')
+
+    def scenario_recipe_create(self):
+        response = self.client.post('/api/recipes/', self.recipe_data(),
+                                    format='json')
+        if response.status_code == 201:
+            self.created.append(response.data['id'])
+        return response
+
+    def scenario_recipe_update(self):
+        if not self.created:
+            self.check_response(self.scenario_recipe_create())
+        return self.client.patch(
+            f'/api/recipes/{self.random.choice(self.created)}/',
+            self.recipe_data(), format='json')
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,164 @@
+import io
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.response_cache import ALL_SCOPE, bump_scopes, tag_scope
+from recipes.counters import COUNTERS, actual_count
+from recipes.feed import fan_out_recipes
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription, User
+
+BENCHMARK_EMAIL = 'bench_{number}@example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_IMAGE = 'recipes/images/benchmark.png'
+BENCHMARK_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = ('Создаёт воспроизводимый набор данных для нагрузочных тестов: '
+            'пользователей bench_N@example.com (пароль benchmark-password), '
+            'их рецепты, избранное, списки покупок и подписки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=30)
+        parser.add_argument('--carts-per-user', type=int, default=10)
+        parser.add_argument('--subscriptions-per-user', type=int,
+                            default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданные данные перед генерацией')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        benchmark_users = User.objects.filter(
+            email__startswith='bench_', email__endswith='@example.com')
+        if options['clear']:
+            deleted, _ = benchmark_users.delete()
+            self.stdout.write(f'Удалено объектов: {deleted}')
+        elif benchmark_users.exists():
+            raise CommandError(
+                'Данные для нагрузочных тестов уже есть, '
+                'используйте --clear')
+        tags = list(Tag.objects.order_by('id'))
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True))
+        if not tags or not ingredient_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги: '
+                'python manage.py load_ingredients_tags')
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            user_ids = [user.id for user in users]
+            self.create_links(
+                Subscription, 'user', 'author', user_ids, user_ids,
+                options['subscriptions_per_user'], exclude_self=True)
+            self.update_counters(User, user_ids)
+            recipes = self.create_recipes(user_ids, options['recipes'])
+            recipe_ids = [recipe.id for recipe in recipes]
+            self.create_recipe_links(recipes, tags, ingredient_ids,
+                                     options['ingredients_per_recipe'])
+            self.create_links(Favorite, 'user', 'recipe', user_ids,
+                              recipe_ids, options['favorites_per_user'])
+            self.create_links(ShoppingCart, 'user', 'recipe', user_ids,
+                              recipe_ids, options['carts_per_user'])
+            self.update_counters(User, user_ids)
+            self.update_counters(Recipe, recipe_ids)
+            fan_out_recipes(recipes)
+            transaction.on_commit(lambda: bump_scopes(
+                {ALL_SCOPE, *(tag_scope(tag.slug) for tag in tags)}))
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)}'))
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects,
+                                         batch_size=self.batch_size)
+
+    def create_users(self, count):
+        password = make_password(BENCHMARK_PASSWORD)
+        return self.bulk_create(User, [
+            User(email=BENCHMARK_EMAIL.format(number=number),
+                 username=f'bench_{number}',
+                 first_name=f'Имя {number}',
+                 last_name=f'Фамилия {number}',
+                 password=password)
+            for number in range(count)
+        ])
+
+    def create_recipes(self, user_ids, count):
+        if not default_storage.exists(BENCHMARK_IMAGE):
+            buffer = io.BytesIO()
+            Image.new('RGB', (600, 400), 'orange').save(buffer, 'PNG')
+            default_storage.save(BENCHMARK_IMAGE,
+                                 ContentFile(buffer.getvalue()))
+        recipes = self.bulk_create(Recipe, [
+            Recipe(author_id=self.random.choice(user_ids),
+                   name=f'Рецепт {number}',
+                   text=f'Описание рецепта {number}',
+                   cooking_time=self.random.randint(5, 180),
+                   image=BENCHMARK_IMAGE)
+            for number in range(count)
+        ])
+        # auto_now_add перезаписывает pub_date при вставке, поэтому даты
+        # публикации и короткие ссылки проставляются вторым проходом.
+        for recipe in recipes:
+            recipe.pub_date = BENCHMARK_START + timedelta(
+                minutes=self.random.randint(0, 365 * 24 * 60))
+            recipe.short_url = recipe.generate_short_url()
+        Recipe.objects.bulk_update(recipes, ['pub_date', 'short_url'],
+                                   batch_size=self.batch_size)
+        return recipes
+
+    def create_recipe_links(self, recipes, tags, ingredient_ids,
+                            per_recipe):
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe in recipes:
+            for tag in self.random.sample(
+                    tags, self.random.randint(1, min(3, len(tags)))):
+                recipe_tags.append(Recipe.tags.through(
+                    recipe_id=recipe.id, tag_id=tag.id))
+            for ingredient_id in self.random.sample(
+                    ingredient_ids, min(per_recipe, len(ingredient_ids))):
+                recipe_ingredients.append(RecipeIngredient(
+                    recipe_id=recipe.id, ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 1000)))
+        self.bulk_create(Recipe.tags.through, recipe_tags)
+        self.bulk_create(RecipeIngredient, recipe_ingredients)
+
+    def create_links(self, model, field, target_field, ids, target_ids,
+                     per_object, exclude_self=False):
+        links = []
+        for pk in ids:
+            targets = self.random.sample(
+                target_ids, min(per_object + exclude_self, len(target_ids)))
+            if exclude_self:
+                targets = [target for target in targets
+                           if target != pk][:per_object]
+            links.extend(
+                model(**{f'{field}_id': pk, f'{target_field}_id': target})
+                for target in targets)
+        self.bulk_create(model, links)
+
+    def update_counters(self, model, pks):
+        for counted_model, field, related_model, related_field in COUNTERS:
+            if counted_model is not model:
+                continue
+            for start in range(0, len(pks), self.batch_size):
+                model.objects.filter(
+                    pk__in=pks[start:start + self.batch_size]
+                ).update(**{field: actual_count(related_model,
+                                                related_field)})
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.14 on 2026-10-18 02:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.search import restore_sqlite_triggers
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    User = apps.get_model('users', 'User')
+    Subscription = apps.get_model('users', 'Subscription')
+
+    def actual_count(related_model, related_field):
+        return Coalesce(Subquery(
+            related_model.objects.filter(
+                **{related_field: OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ), 0)
+
+    Recipe.objects.update(
+        favorites_count=actual_count(Favorite, 'recipe'),
+        in_carts_count=actual_count(ShoppingCart, 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=actual_count(Recipe, 'author'),
+        subscribers_count=actual_count(Subscription, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_name_id_idx'),
+        ('users', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(restore_sqlite_triggers,
+                             migrations.RunPython.noop),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.14 on 2026-10-18 03:17
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет первую из повторяющихся пар (рецепт, пользователь)
+    и уменьшает счётчики на число удалённых строк."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name, field in (('Favorite', 'favorites_count'),
+                              ('ShoppingCart', 'in_carts_count')):
+        model = apps.get_model('recipes', model_name)
+        duplicates = model.objects.values('recipe', 'user').annotate(
+            first=Min('pk'), total=Count('pk')
+        ).filter(total__gt=1).order_by()
+        for duplicate in duplicates:
+            model.objects.filter(
+                recipe=duplicate['recipe'], user=duplicate['user']
+            ).exclude(pk=duplicate['first']).delete()
+            Recipe.objects.filter(pk=duplicate['recipe']).update(
+                **{field: F(field) - (duplicate['total'] - 1)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_favorite_recipe_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_shoppingcart_recipe_user'),
+        ),
+    ]
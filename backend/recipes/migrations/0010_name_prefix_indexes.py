@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from recipes.indexes import create_prefix_indexes, drop_prefix_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_user_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -1,9 +1,8 @@
 import string
-import random
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
-from users.models import User
+from users.models import UpdateOnlyFieldsMixin, User
 from foodgram import constants
 
 
@@ -15,6 +14,10 @@ class Tag(models.Model):
         max_length=constants.MAX_TAG_LENGTH,
         unique=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -31,16 +34,23 @@ class Ingredient(models.Model):
     measurement_unit = models.CharField(
         max_length=constants.MAX_MEASUREMENT_UNIT_LENGHT
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        indexes = [
+            models.Index(fields=['name'], name='ingredient_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(UpdateOnlyFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         related_name='recipes',
@@ -55,6 +65,12 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         blank=True,
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
     text = models.TextField(
         verbose_name='Описание рецепта'
     )
@@ -83,27 +99,58 @@ class Recipe(models.Model):
         null=True,
         verbose_name='Короткая ссылка'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    pub_date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата публикации'
+    )
+
+    UPDATE_ONLY_FIELDS = ('image_variants', 'favorites_count',
+                          'in_carts_count')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='recipe_name_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     def generate_short_url(self):
-        characters = string.ascii_letters + string.digits
-        while True:
-            short_url = ''.join(
-                random.choice(characters) for _ in range(constants.LENGTH_URL))
-            if not Recipe.objects.filter(short_url=short_url).exists():
-                return short_url
+        """Биекция pk -> код длины LENGTH_URL в base62, без запросов к БД.
+
+        Длина отличается от старых случайных 6-символьных кодов.
+        """
+        characters = string.digits + string.ascii_letters
+        number = (self.pk * constants.SHORT_URL_MULTIPLIER
+                  % len(characters) ** constants.LENGTH_URL)
+        short_url = []
+        for _ in range(constants.LENGTH_URL):
+            number, index = divmod(number, len(characters))
+            short_url.append(characters[index])
+        return ''.join(reversed(short_url))
 
     def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
         if not self.short_url:
             self.short_url = self.generate_short_url()
-        super().save(*args, **kwargs)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_url=self.short_url)
 
 
 class RecipeUserModel(models.Model):
@@ -125,7 +172,7 @@ class RecipeUserModel(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=['recipe', 'user'],
-                name='unique_together_recipe_user'
+                name='unique_%(class)s_recipe_user'
             )
         ]
         ordering = ['recipe', 'user']
@@ -136,6 +183,7 @@ class Favorite(RecipeUserModel):
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
+        constraints = RecipeUserModel.Meta.constraints
 
     def __str__(self):
         return f'{self.recipe.name} в избраннном у {self.user.username}'
@@ -146,6 +194,7 @@ class ShoppingCart(RecipeUserModel):
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+        constraints = RecipeUserModel.Meta.constraints
 
     def __str__(self):
         return (f'{self.recipe.name} в списке покупок у '
@@ -179,3 +228,57 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline_entries',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='timeline_entries',
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_timeline_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте {self.user_id}'
+
+
+class ImportCheckpoint(models.Model):
+    name = models.CharField(
+        max_length=constants.MAX_LENGTH,
+        unique=True,
+        verbose_name='Название'
+    )
+    line = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Последняя загруженная строка'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка загрузки'
+        verbose_name_plural = 'Контрольные точки загрузки'
+
+    def __str__(self):
+        return f'{self.name}: {self.line}'
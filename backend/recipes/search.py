@@ -0,0 +1,147 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+POSTGRES_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+
+POSTGRES_SETUP = [
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    f'''
+    CREATE FUNCTION recipes_recipe_search_vector_update()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{POSTGRES_CONFIG}',
+                                  coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{POSTGRES_CONFIG}',
+                                     coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector_update()
+    ''',
+    'UPDATE recipes_recipe SET name = name',
+    '''
+    CREATE INDEX recipes_recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector)
+    ''',
+]
+
+POSTGRES_TEARDOWN = [
+    'DROP TRIGGER recipes_recipe_search_vector_trigger ON recipes_recipe',
+    'DROP FUNCTION recipes_recipe_search_vector_update()',
+    'ALTER TABLE recipes_recipe DROP COLUMN search_vector',
+]
+
+SQLITE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    ''',
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_SETUP = [
+    f'''
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    *SQLITE_TRIGGERS,
+]
+
+SQLITE_TEARDOWN = [f'DROP TABLE {FTS_TABLE}']
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_SETUP)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_SETUP)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_TEARDOWN)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_TEARDOWN)
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    """SQLite пересоздаёт таблицу при части миграций и теряет триггеры."""
+    if schema_editor.connection.vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_TRIGGERS)
+
+
+def fts_query(value):
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', value))
+
+
+def search_recipes(queryset, value):
+    """Фильтрует рецепты по названию и описанию, лучшие совпадения
+    идут первыми."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return queryset.alias(
+            search_match=RawSQL(
+                'recipes_recipe.search_vector @@ '
+                f"websearch_to_tsquery('{POSTGRES_CONFIG}', %s)",
+                (value,), output_field=BooleanField()),
+        ).filter(search_match=True).annotate(
+            search_rank=RawSQL(
+                'ts_rank_cd(recipes_recipe.search_vector, '
+                f"websearch_to_tsquery('{POSTGRES_CONFIG}', %s))",
+                (value,), output_field=FloatField()),
+        ).order_by('-search_rank', 'name', 'id')
+    if vendor == 'sqlite':
+        query = fts_query(value)
+        if not query:
+            return queryset.none()
+        # Запрос идёт от индекса FTS: совпадения берутся из него, рецепты
+        # подтягиваются по первичному ключу, bm25 считается один раз на
+        # совпадение. Соединиться с таблицей без модели ORM позволяет
+        # только через extra().
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = recipes_recipe.id',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[query],
+            select={'search_rank': f'bm25({FTS_TABLE}, 10.0, 1.0)'},
+        ).order_by('search_rank', 'name', 'id')
+    return queryset.filter(Q(name__icontains=value)
+                           | Q(text__icontains=value))
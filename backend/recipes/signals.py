@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+
+from recipes.counters import COUNTERS, bulk_change_active, change_counter
+from recipes.feed import (recipe_created, subscription_added,
+                          subscription_removed)
+from recipes.models import Recipe
+from users.models import Subscription
+
+
+def connect_counter(model, field, related_model, related_field):
+    attname = f'{related_field}_id'
+
+    def added(sender, instance, created, **kwargs):
+        if created and not bulk_change_active.get():
+            change_counter(model, getattr(instance, attname), field, 1)
+
+    def removed(sender, instance, **kwargs):
+        if not bulk_change_active.get():
+            change_counter(model, getattr(instance, attname), field, -1)
+
+    post_save.connect(added, sender=related_model, weak=False,
+                      dispatch_uid=f'{field}_added')
+    post_delete.connect(removed, sender=related_model, weak=False,
+                        dispatch_uid=f'{field}_removed')
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+# Лента подключается после счётчиков: ей нужен уже обновлённый
+# subscriptions_count.
+post_save.connect(recipe_created, sender=Recipe,
+                  dispatch_uid='timeline_recipe_created')
+post_save.connect(subscription_added, sender=Subscription,
+                  dispatch_uid='timeline_subscription_added')
+post_delete.connect(subscription_removed, sender=Subscription,
+                    dispatch_uid='timeline_subscription_removed')
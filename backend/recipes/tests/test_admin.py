@@ -0,0 +1,54 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from recipes.indexes import PREFIX_INDEXES
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+
+class AdminPrefixSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='А',
+            last_name='Б', password='pass12345!')
+        Ingredient.objects.create(name='Ингредиент 05', measurement_unit='г')
+        Recipe.objects.create(author=cls.admin, name='Борщ',
+                              text='Описание', cooking_time=10)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_prefix_search(self):
+        # LIKE в SQLite не учитывает регистр только для ASCII, поэтому
+        # запросы в том же регистре, что и названия.
+        for url, query, found, missing in (
+            ('/admin/recipes/ingredient/', 'Ингредиент', 'Ингредиент 05',
+             None),
+            ('/admin/recipes/recipe/', 'Бор', 'Борщ', None),
+            ('/admin/recipes/recipe/', 'рщ', None, 'Борщ'),
+        ):
+            with self.subTest(url=url, query=query):
+                response = self.client.get(url, {'q': query})
+                self.assertEqual(response.status_code, 200)
+                names = set(response.context['cl'].result_list.values_list(
+                    'name', flat=True))
+                if found:
+                    self.assertIn(found, names)
+                if missing:
+                    self.assertNotIn(missing, names)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'функциональные индексы создаются только в PostgreSQL')
+    def test_prefix_search_uses_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for model, index in zip((Ingredient, Recipe), PREFIX_INDEXES):
+                sql, params = model.objects.filter(
+                    name__istartswith='бор').query.sql_with_params()
+                cursor.execute(f'EXPLAIN {sql}', params)
+                plan = ' '.join(row[0] for row in cursor.fetchall())
+                self.assertIn(index, plan)
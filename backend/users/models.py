@@ -5,7 +5,29 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from foodgram import constants
 
 
-class User(AbstractUser):
+class UpdateOnlyFieldsMixin:
+    """Поля из UPDATE_ONLY_FIELDS (счётчики и уменьшенные копии
+    изображений) меняются только через QuerySet.update().
+
+    save() существующей записи без update_fields пишет остальные поля,
+    иначе устаревшие значения из памяти затёрли бы чужие изменения.
+    """
+
+    UPDATE_ONLY_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (not args and not self._state.adding
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            excluded = {*self.UPDATE_ONLY_FIELDS, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in excluded
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(UpdateOnlyFieldsMixin, AbstractUser):
     email = models.EmailField(
         unique=True,
     )
@@ -27,7 +49,30 @@ class User(AbstractUser):
         upload_to='users/avatars/',
         blank=True
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии аватара'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписок'
+    )
 
+    UPDATE_ONLY_FIELDS = ('avatar_variants', 'recipes_count',
+                          'subscribers_count', 'subscriptions_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name',
                        'last_name', 'password']